@@ -3,6 +3,7 @@ import asyncio
 from azure.identity.aio import ClientSecretCredential
 from msgraph.aio import GraphServiceClient, GraphClientConfig , GraphRequestAdapter , AsyncHttpProvider
 from kioto_authenitication_azure_identity_authentication_provider import AzureIdentityAuthenticationProvider
+from graph_batch import GraphBatchClient
 
 
 AXURE_TENANT_ID = "AZURE_TENANT_ID"
@@ -13,7 +14,7 @@ MAILBOX_USER = "MAILBOX_USER_EMAIL"
 
 logger = structlog.get_logger()
 
-async def read_email_attachments(client):
+async def read_email_attachments(client, batch_client):
     messages = await client.users[MAILBOX_USER].message.get(
         query_parameters={
             "$top": 10,
@@ -23,7 +24,13 @@ async def read_email_attachments(client):
 
     )
 
-    for message in messages.value:
+    # Attachment lists of all messages through Graph $batch, in message order
+    attachments = await batch_client.get_many(
+        f"/users/{MAILBOX_USER}/messages/{message.id}/attachments?$select=id,name,contentType,size"
+        for message in messages.value
+    )
+
+    for message, attachment in zip(messages.value, attachments):
         email_log = {
             "subject": message.subject,
             "from": message.from_.email_address.address,
@@ -31,13 +38,12 @@ async def read_email_attachments(client):
             "attachments": []
         }
 
-        attachment = await client.users[MAILBOX_USER].messages[message.id].attachments.get()
-        for att in attachment.value:
+        for att in attachment["value"]:
             email_log["attachments"].append({
-                "id": att.id,
-                "name": att.name,
-                "contentType": att.content_type,
-                "size": att.size
+                "id": att["id"],
+                "name": att["name"],
+                "contentType": att["contentType"],
+                "size": att["size"]
             })
         logger.info("Email with attachments", email = email_log)
 
@@ -51,9 +57,11 @@ async def main():
     adapter = GraphRequestAdapter(auth_provider)
     transport = AsyncHttpProvider()
     client = GraphServiceClient(adapter, transport = transport)
+    batch_client = GraphBatchClient(credits)
     try:
-        await read_email_attachments(client)
+        await read_email_attachments(client, batch_client)
     finally:
+        await batch_client.close()
         await credits.close()
         await transport.close()
 if __name__ == "__main__":
@@ -1,7 +1,12 @@
+from core.findings import register_issue
+
+ACL_PUBLIC = register_issue("S3_ACL_PUBLIC", "ACL allow public access")
+
+
 def check_acl(acl):
     for grant in acl.get("Grants" , []):
         grantee = grant.get("Grantee" , {})
         uri = grantee.get("URI", "")
-        if AllUsers in uri or "AuthenticatedUsers" in uri:
-            return True , "ACL allow public access"
-    return false , None
+        if "AllUsers" in uri or "AuthenticatedUsers" in uri:
+            return True , ACL_PUBLIC
+    return False , None
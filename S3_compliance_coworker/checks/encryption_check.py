@@ -0,0 +1,9 @@
+from core.findings import register_issue
+
+ENCRYPTION_MISSING = register_issue("S3_ENCRYPTION_MISSING", "Default encryption not configured")
+
+
+def check_encryption(encryption):
+    if not encryption or not encryption.get("Rules"):
+        return True, ENCRYPTION_MISSING
+    return False, None
@@ -0,0 +1,9 @@
+from core.findings import register_issue
+
+LOGGING_DISABLED = register_issue("S3_LOGGING_DISABLED", "Server access logging not enabled")
+
+
+def check_logging(logging):
+    if not logging:
+        return True, LOGGING_DISABLED
+    return False, None
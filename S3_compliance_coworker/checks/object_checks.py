@@ -0,0 +1,125 @@
+import base64
+import json
+from functools import lru_cache
+
+from core.findings import register_issue
+from checks.acl_check import check_acl
+
+OBJECT_ACL_PUBLIC = register_issue("S3_OBJECT_ACL_PUBLIC", "Object ACL allows public access")
+OBJECT_UNENCRYPTED = register_issue("S3_OBJECT_UNENCRYPTED", "Object is not encrypted at rest")
+OBJECT_FOREIGN_OWNER = register_issue("S3_OBJECT_FOREIGN_OWNER", "Object owned by another account")
+OBJECTS_NOT_LISTED = register_issue("S3_OBJECTS_NOT_LISTED", "{count} more object(s) not listed: {issue}")
+OBJECT_SCAN_INCOMPLETE = register_issue(
+    "S3_OBJECT_SCAN_INCOMPLETE",
+    "Inventory scan stopped before data file {file} of {files}: time budget exhausted"
+)
+
+# S3 Inventory fields the object checks read. CSV reports name them like
+# this; ORC and Parquet reports use snake case (encryption_status).
+FIELDS = (
+    "Key",
+    "Size",
+    "IsLatest",
+    "IsDeleteMarker",
+    "EncryptionStatus",
+    "ObjectOwner",
+    "ObjectAccessControlList"
+)
+
+
+@lru_cache(maxsize=4096)
+def acl_is_public(value):
+    """
+    Whether an inventory ObjectAccessControlList value grants AllUsers or
+    AuthenticatedUsers. The value is base64 of {"grants": [{"permission",
+    "type", "uri" | "canonicalId"}, ...]}; objects mostly share a handful
+    of ACLs, so each distinct value is decoded once.
+    """
+    if not value:
+        return False
+    acl = json.loads(base64.b64decode(value))
+    grants = [{"Grantee": {"URI": grant.get("uri", "")}} for grant in acl.get("grants", [])]
+    return check_acl({"Grants": grants})[0]
+
+
+def select_arrow(batch, bucket_owner, min_size):
+    """
+    Vectorized selection over a pyarrow record batch with FIELDS columns
+    (fields the report does not include are absent). Returns {code: (keys, sizes)}
+    for the current, non-delete-marker objects of at least min_size bytes.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    def column(name):
+        return batch[name] if name in batch.schema.names else None
+
+    def flag(name):
+        values = column(name)
+        if values is None:
+            return None
+        return pc.equal(values, "true") if pa.types.is_string(values.type) else values
+
+    size = column("Size")
+    if size is not None and pa.types.is_string(size.type):
+        size = pc.cast(pc.if_else(pc.equal(size, ""), "0", size), pa.int64())
+
+    live = pa.array([True] * batch.num_rows)
+    latest, delete_marker = flag("IsLatest"), flag("IsDeleteMarker")
+    if latest is not None:
+        live = pc.and_(live, pc.fill_null(latest, True))
+    if delete_marker is not None:
+        live = pc.and_(live, pc.invert(pc.fill_null(delete_marker, False)))
+    if size is not None and min_size:
+        live = pc.and_(live, pc.greater_equal(pc.fill_null(size, 0), min_size))
+
+    masks = {}
+    encryption = column("EncryptionStatus")
+    if encryption is not None:
+        masks[OBJECT_UNENCRYPTED] = pc.equal(encryption, "NOT-SSE")
+    owner = column("ObjectOwner")
+    if owner is not None and bucket_owner:
+        masks[OBJECT_FOREIGN_OWNER] = pc.and_(pc.not_equal(owner, ""), pc.not_equal(owner, bucket_owner))
+    acl = column("ObjectAccessControlList")
+    if acl is not None:
+        public = [value for value in pc.unique(acl).to_pylist() if acl_is_public(value)]
+        masks[OBJECT_ACL_PUBLIC] = pc.is_in(acl, value_set=pa.array(public, acl.type))
+
+    selected = {}
+    for code, mask in masks.items():
+        mask = pc.and_(live, pc.fill_null(mask, False))
+        if not pc.any(mask).as_py():
+            continue
+        keys = pc.filter(column("Key"), mask).to_pylist()
+        sizes = pc.filter(size, mask).to_pylist() if size is not None else [None] * len(keys)
+        selected[code] = (keys, sizes)
+    return selected
+
+
+def select_rows(columns, bucket_owner, min_size):
+    """select_arrow for a batch of plain column lists (CSV without pyarrow)."""
+    rows = len(columns["Key"])
+    empty = [""] * rows
+
+    selected = {}
+    for index in range(rows):
+        if columns.get("IsLatest", empty)[index] == "false" or columns.get("IsDeleteMarker", empty)[index] == "true":
+            continue
+        size = int(columns.get("Size", empty)[index] or 0)
+        if "Size" in columns and size < min_size:
+            continue
+
+        codes = []
+        if columns.get("EncryptionStatus", empty)[index] == "NOT-SSE":
+            codes.append(OBJECT_UNENCRYPTED)
+        owner = columns.get("ObjectOwner", empty)[index]
+        if owner and bucket_owner and owner != bucket_owner:
+            codes.append(OBJECT_FOREIGN_OWNER)
+        if acl_is_public(columns.get("ObjectAccessControlList", empty)[index]):
+            codes.append(OBJECT_ACL_PUBLIC)
+
+        for code in codes:
+            keys, sizes = selected.setdefault(code, ([], []))
+            keys.append(columns["Key"][index])
+            sizes.append(size)
+    return selected
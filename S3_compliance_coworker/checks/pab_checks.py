@@ -1,9 +1,15 @@
+from core.findings import register_issue
+
+PAB_MISSING = register_issue("S3_PAB_MISSING", "Public Access Block not configured")
+PAB_PARTIAL = register_issue("S3_PAB_PARTIAL", "Public Access Block partially disabled")
+
+
 def check_public_access_block(pab):
     if not pab:
-        return True, "Public Access Block not configured"
+        return True, PAB_MISSING
 
     if not all(pab.values()):
-        return True, "Public Access Block partially disabled"
+        return True, PAB_PARTIAL
 
     return False, None
 
@@ -1,12 +1,103 @@
 import json
+from functools import lru_cache
 
-def check_policy(policy_str):
+from core.findings import register_issue
+
+POLICY_CACHE_SIZE = 4096
+
+# Condition keys that, when matched positively, limit an Allow to a known
+# network or organisation and so stop a "*" principal from being public.
+NARROWING_KEYS = {
+    "aws:sourcevpc",
+    "aws:sourcevpce",
+    "aws:sourceip",
+    "aws:principalorgid",
+    "aws:principalorgpaths",
+    "aws:principalaccount",
+    "aws:principalarn",
+    "aws:sourceaccount",
+    "aws:sourcearn",
+    "aws:sourceowner",
+}
+
+NARROWING_OPERATORS = {
+    "stringequals",
+    "stringequalsignorecase",
+    "stringlike",
+    "arnequals",
+    "arnlike",
+    "ipaddress",
+}
+
+OPEN_VALUES = {"*", "0.0.0.0/0", "::/0"}
+
+POLICY_PUBLIC = register_issue("S3_POLICY_PUBLIC", "Bucket policy allows public principal")
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def _public_principal(stmt):
+    # NotPrincipal on an Allow grants everyone except the listed principals.
+    if "NotPrincipal" in stmt:
+        return True
+
+    principal = stmt.get("Principal")
+    if principal == "*":
+        return True
+    if isinstance(principal, dict):
+        return "*" in _as_list(principal.get("AWS"))
+    return False
+
+
+def _narrowing_keys(stmt):
+    keys = set()
+    for operator, clauses in (stmt.get("Condition") or {}).items():
+        operator = operator.lower()
+        if operator.startswith("foranyvalue:"):
+            operator = operator[len("foranyvalue:"):]
+        # ...IfExists passes when the key is absent, so it narrows nothing.
+        if operator not in NARROWING_OPERATORS:
+            continue
+        for key, values in clauses.items():
+            values = _as_list(values)
+            key = key.lower()
+            if key in NARROWING_KEYS and values and not any(v in OPEN_VALUES for v in values):
+                keys.add(key)
+    return frozenset(keys)
+
+
+def compile_policy(policy_str):
+    """
+    Reduce a policy document to the Allow statements that matter for
+    public access: a tuple of (public_principal, narrowing_condition_keys).
+    """
     policy = json.loads(policy_str)
 
-    for stmt in policy.get("Statement", []):
-        if stmt.get("Effect") == "Allow":
-            principal = stmt.get("Principal")
-            if principal == "*" or principal == {"AWS" : "*"}
-            return True , "Bucket policy allows public principal"
-    return False , None
+    compiled = []
+    for stmt in _as_list(policy.get("Statement")):
+        if stmt.get("Effect") != "Allow":
+            continue
+        compiled.append((_public_principal(stmt), _narrowing_keys(stmt)))
+    return tuple(compiled)
 
+
+@lru_cache(maxsize=POLICY_CACHE_SIZE)
+def evaluate_policy(policy_str):
+    """
+    Cached verdict per distinct policy document. Buckets sharing a
+    templated policy pay for parsing once.
+    """
+    for public_principal, narrowing in compile_policy(policy_str):
+        if public_principal and not narrowing:
+            return True, POLICY_PUBLIC
+    return False, None
+
+
+def check_policy(policy_str):
+    return evaluate_policy(policy_str)
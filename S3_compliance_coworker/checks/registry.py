@@ -0,0 +1,180 @@
+from botocore.exceptions import ClientError
+
+from core.retry import aws_retry, error_code
+from checks.acl_check import check_acl
+from checks.pab_checks import check_public_access_block
+from checks.policy_check import check_policy
+from checks.encryption_check import check_encryption
+from checks.versioning_check import check_versioning
+from checks.logging_check import check_logging
+
+
+class Resource:
+    """
+    One per-bucket S3 API result. Error codes in missing_codes mean
+    "not configured" and are returned as the default value instead of
+    failing the bucket.
+    """
+
+    def __init__(self, name, api, fetch, missing_codes=(), default=None):
+        self.name = name
+        self.api = api
+        self.fetch = fetch
+        self.missing_codes = set(missing_codes)
+        self.default = default
+
+
+class Check:
+    """
+    A bucket check and the resources it needs. covered_by_account_pab marks
+    checks that cannot find public access when the account-level Public
+    Access Block blocks everything.
+    """
+
+    def __init__(self, name, needs, fn, covered_by_account_pab=False):
+        self.name = name
+        self.needs = needs
+        self.fn = fn
+        self.covered_by_account_pab = covered_by_account_pab
+
+
+RESOURCES = {}
+CHECKS = []
+
+
+def register_resource(resource):
+    RESOURCES[resource.name] = resource
+    return resource
+
+
+def register_check(name, needs, covered_by_account_pab=False):
+    """Decorator: fn receives the needed resources as keyword arguments."""
+    def wrap(fn):
+        CHECKS.append(Check(name, needs, fn, covered_by_account_pab))
+        return fn
+    return wrap
+
+
+register_resource(Resource(
+    "acl", "GetBucketAcl",
+    lambda s3, name: s3.get_bucket_acl(Bucket=name)
+))
+register_resource(Resource(
+    "pab", "GetPublicAccessBlock",
+    lambda s3, name: s3.get_public_access_block(Bucket=name)["PublicAccessBlockConfiguration"],
+    missing_codes=["NoSuchPublicAccessBlockConfiguration"],
+    default={}
+))
+register_resource(Resource(
+    "policy", "GetBucketPolicy",
+    lambda s3, name: s3.get_bucket_policy(Bucket=name)["Policy"],
+    missing_codes=["NoSuchBucketPolicy"]
+))
+register_resource(Resource(
+    "encryption", "GetBucketEncryption",
+    lambda s3, name: s3.get_bucket_encryption(Bucket=name)["ServerSideEncryptionConfiguration"],
+    missing_codes=["ServerSideEncryptionConfigurationNotFoundError"]
+))
+register_resource(Resource(
+    "versioning", "GetBucketVersioning",
+    lambda s3, name: s3.get_bucket_versioning(Bucket=name)
+))
+register_resource(Resource(
+    "logging", "GetBucketLogging",
+    lambda s3, name: s3.get_bucket_logging(Bucket=name).get("LoggingEnabled")
+))
+
+
+@register_check("acl", ["acl"], covered_by_account_pab=True)
+def _acl(acl):
+    return check_acl(acl)
+
+
+@register_check("public_access_block", ["pab"], covered_by_account_pab=True)
+def _public_access_block(pab):
+    return check_public_access_block(pab)
+
+
+@register_check("policy", ["policy"], covered_by_account_pab=True)
+def _policy(policy):
+    if policy is None:
+        return False, None
+    return check_policy(policy)
+
+
+@register_check("encryption", ["encryption"])
+def _encryption(encryption):
+    return check_encryption(encryption)
+
+
+@register_check("versioning", ["versioning"])
+def _versioning(versioning):
+    return check_versioning(versioning)
+
+
+@register_check("logging", ["logging"])
+def _logging(logging):
+    return check_logging(logging)
+
+
+def select_checks(enabled, account_pab_blocks_all=False):
+    """Registered checks named in enabled, in registration order."""
+    return [
+        check for check in CHECKS
+        if check.name in enabled
+        and not (account_pab_blocks_all and check.covered_by_account_pab)
+    ]
+
+
+def plan_resources(checks):
+    """Each resource needed by any of the checks, once, in first-use order."""
+    needed = []
+    for check in checks:
+        for name in check.needs:
+            if name not in needed:
+                needed.append(name)
+    return needed
+
+
+def fetch_resources(s3, account_id, name, resources):
+    data = {}
+    for resource_name in resources:
+        resource = RESOURCES[resource_name]
+        try:
+            data[resource_name] = aws_retry(
+                lambda: resource.fetch(s3, name),
+                limiter_key=(account_id, "s3", resource.api)
+            )
+        except ClientError as e:
+            if error_code(e) not in resource.missing_codes:
+                raise
+            data[resource_name] = resource.default
+    return data
+
+
+def run_checks(checks, data):
+    """Yield the issue code of every check that hits, in check order."""
+    for check in checks:
+        hit, code = check.fn(**{need: data[need] for need in check.needs})
+        if hit:
+            yield code
+
+
+def account_pab_blocks_all(s3control, account_id):
+    """True when the account-level Public Access Block has all four settings on."""
+    try:
+        pab = aws_retry(
+            lambda: s3control.get_public_access_block(AccountId=account_id)["PublicAccessBlockConfiguration"],
+            limiter_key=(account_id, "s3control", "GetPublicAccessBlock")
+        )
+    except ClientError as e:
+        if error_code(e) != "NoSuchPublicAccessBlockConfiguration":
+            raise
+        return False
+
+    return all(pab.get(setting) for setting in (
+        "BlockPublicAcls",
+        "IgnorePublicAcls",
+        "BlockPublicPolicy",
+        "RestrictPublicBuckets"
+    ))
@@ -0,0 +1,9 @@
+from core.findings import register_issue
+
+VERSIONING_DISABLED = register_issue("S3_VERSIONING_DISABLED", "Versioning not enabled")
+
+
+def check_versioning(versioning):
+    if versioning.get("Status") != "Enabled":
+        return True, VERSIONING_DISABLED
+    return False, None
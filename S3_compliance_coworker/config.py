@@ -2,9 +2,41 @@ import os
 
 import json
 
+# Parsed and validated once per container (module import); a bad setting
+# fails the first invocation with one clear message instead of mid-scan.
+
+
+def _required(name):
+    value = os.environ.get(name, "").strip()
+    if not value:
+        raise ValueError(f"{name} must be set")
+    return value
+
+
+def _choice(name, default, choices):
+    value = os.environ.get(name, default)
+    if value not in choices:
+        raise ValueError(f"{name} must be one of {', '.join(choices)}, got {value!r}")
+    return value
+
+
+def _accounts(fields):
+    try:
+        accounts = json.loads(_required("ACCOUNTS_JSON"))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"ACCOUNTS_JSON is not valid JSON: {e}")
+    if not isinstance(accounts, list):
+        raise ValueError("ACCOUNTS_JSON must be a JSON list of accounts")
+    for index, acc in enumerate(accounts):
+        missing = [field for field in fields if not isinstance(acc, dict) or field not in acc]
+        if missing:
+            raise ValueError(f"ACCOUNTS_JSON[{index}] is missing {', '.join(missing)}")
+    return accounts
+
+
 SERVICE_NAME = "S3-public-access-coworker"
 
-ACCOUNTS = json.loads(os.environ["ACCOUNTS_JSON"])
+ACCOUNTS = _accounts(("account_id", "role_arn"))
 
 # Example env value:
 # [
@@ -14,7 +46,83 @@ ACCOUNTS = json.loads(os.environ["ACCOUNTS_JSON"])
 #   }
 # ]
 
-REPORT_BUCKET = os.environ["REPORT_BUDCKET"]
+REPORT_BUCKET = _required("REPORT_BUCKET")
 REPORT_KEY = os.environ.get("REPORT_KEY", "s3_public_audit.csv")
 
+# "sequential" walks accounts and buckets one at a time,
+# "concurrent" fans the per-bucket fetches and checks out on a thread pool.
+SCAN_MODE = _choice("SCAN_MODE", "sequential", ("sequential", "concurrent"))
+MAX_WORKERS = int(os.environ.get("MAX_WORKERS", "32"))
+MAX_WORKERS_PER_ACCOUNT = int(os.environ.get("MAX_WORKERS_PER_ACCOUNT", "8"))
+# Concurrent mode lists buckets page by page and keeps at most SCAN_WINDOW
+# buckets in flight or awaiting their turn, so memory does not grow with
+# the number of buckets.
+SCAN_WINDOW = int(os.environ.get("SCAN_WINDOW", "1000"))
+
+# Shared token bucket per (account, service, api) used by core.retry.aws_retry.
+API_RATE_LIMIT = float(os.environ.get("API_RATE_LIMIT", "50"))
+API_BURST = int(os.environ.get("API_BURST", "50"))
+
+# Incremental mode re-checks only new/re-created buckets and buckets whose
+# last check is older than FULL_RESCAN_HOURS, reusing stored findings for the rest.
+# STATE_LOCATION is an s3://bucket/key URI or a local path.
+INCREMENTAL = os.environ.get("INCREMENTAL", "false").lower() == "true"
+STATE_LOCATION = os.environ.get("STATE_LOCATION", f"s3://{REPORT_BUCKET}/state/s3_audit_state.json")
+FULL_RESCAN_HOURS = int(os.environ.get("FULL_RESCAN_HOURS", "24"))
+
+# Stream the report through S3 multipart upload as findings are produced
+# instead of building it in memory; REPORT_COMPRESS gzips it (key gets ".gz").
+REPORT_STREAMING = os.environ.get("REPORT_STREAMING", "false").lower() == "true"
+REPORT_COMPRESS = os.environ.get("REPORT_COMPRESS", "false").lower() == "true"
+
+# Report output: "csv" overwrites REPORT_KEY on every run. "parquet" and
+# "jsonl" instead add one file per account and run under
+# REPORT_LOCATION/dt=/account=/audit=/ plus a run manifest, for Athena;
+# "parquet" falls back to gzipped JSON lines when pyarrow is not installed.
+REPORT_FORMAT = _choice("REPORT_FORMAT", "csv", ("csv", "parquet", "jsonl"))
+REPORT_LOCATION = os.environ.get("REPORT_LOCATION", f"s3://{REPORT_BUCKET}/findings")
+
+# Checks from checks.registry to run, in registry order. Also available:
+# encryption, versioning, logging.
+ENABLED_CHECKS = [
+    name.strip()
+    for name in os.environ.get("ENABLED_CHECKS", "acl,public_access_block,policy").split(",")
+    if name.strip()
+]
+# Skip the public-access checks for accounts whose account-level (s3control)
+# Public Access Block already blocks everything.
+ACCOUNT_PAB_SHORTCUT = os.environ.get("ACCOUNT_PAB_SHORTCUT", "true").lower() == "true"
+
+# Object-level audit (object_audit.py) from each bucket's latest S3 Inventory
+# report: unencrypted, foreign-owned and public-ACL objects of at least
+# OBJECT_MIN_SIZE bytes. Buckets without an enabled inventory are skipped.
+# At most OBJECT_FINDINGS_PER_BUCKET objects are listed per bucket and issue;
+# the rest are counted in one bucket-level finding.
+OBJECT_AUDIT = os.environ.get("OBJECT_AUDIT", "false").lower() == "true"
+OBJECT_MIN_SIZE = int(os.environ.get("OBJECT_MIN_SIZE", "0"))
+OBJECT_FINDINGS_PER_BUCKET = int(os.environ.get("OBJECT_FINDINGS_PER_BUCKET", "1000"))
+
+# Coordinator/worker fan-out (see fanout.py). Accounts with more than
+# SHARD_MAX_BUCKETS buckets are split into bucket-name ranges; 0 means one
+# shard per account. WORKER_FUNCTION_NAME defaults to this Lambda.
+SHARD_MAX_BUCKETS = int(os.environ.get("SHARD_MAX_BUCKETS", "0"))
+SHARD_LOCATION = os.environ.get("SHARD_LOCATION", f"s3://{REPORT_BUCKET}/shards")
+WORKER_FUNCTION_NAME = os.environ.get("WORKER_FUNCTION_NAME", os.environ.get("AWS_LAMBDA_FUNCTION_NAME", ""))
+
+# Run instrumentation: "emf" writes CloudWatch Embedded Metric Format lines
+# at the end of each run, "json" writes METRICS_PATH, "off" disables it.
+METRICS_MODE = _choice("METRICS_MODE", "emf", ("emf", "json", "off"))
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "DigitalCoworker")
+METRICS_PATH = os.environ.get("METRICS_PATH", "metrics.json")
 
+# Time budget per invocation: once less than TIME_RESERVE_SECONDS remain, the
+# scan stops, saves its cursor and partial findings under CHECKPOINT_LOCATION
+# and returns a continuation_token to pass back in the next event.
+# AUTO_CONTINUE makes the function re-invoke itself with that token.
+# The reserve is capped at a quarter of the time left when the invocation
+# starts, and every slice finishes at least one unit before it may stop.
+# A streamed report keeps each slice's findings in a part next to the
+# checkpoint rather than in it.
+TIME_RESERVE_SECONDS = int(os.environ.get("TIME_RESERVE_SECONDS", "60"))
+CHECKPOINT_LOCATION = os.environ.get("CHECKPOINT_LOCATION", f"s3://{REPORT_BUCKET}/checkpoints")
+AUTO_CONTINUE = os.environ.get("AUTO_CONTINUE", "false").lower() == "true"
@@ -0,0 +1,231 @@
+import json
+import uuid
+from datetime import datetime
+
+from core.aws_session import assume_s3_client, get_base_client
+from core.budget import Deadline, OutOfTime
+from core.findings import Finding, FindingsStore
+from core.logger import start_run
+from core.retry import aws_retry
+from core.state_store import count_objects, create_state, load_state, save_state
+from main import log, open_report_sink, scan_concurrent, scan_sequential, write_report
+from s3_audit import iter_buckets
+from config import *
+
+# Coordinator / worker execution:
+#   coordinate()  splits ACCOUNTS into shards and dispatches one worker event each
+#   run_shard()   scans one shard and writes its partial findings to SHARD_LOCATION
+#   merge_shards() combines every part, in shard order, into the single report
+# Every worker writes its part, also when it fails or runs out of time, and
+# the worker that claims the run's merge marker once all parts exist merges.
+
+
+def make_shards(accounts, max_buckets=SHARD_MAX_BUCKETS):
+    """
+    One shard per account; accounts with more than max_buckets buckets are
+    split into bucket-name ranges (start_after, end_at].
+    """
+    shards = []
+
+    for acc in accounts:
+        names = []
+        if max_buckets:
+            s3 = assume_s3_client(acc["role_arn"])
+            names = sorted(bucket["Name"] for bucket in iter_buckets(s3, acc["account_id"]))
+
+        if not max_buckets or len(names) <= max_buckets:
+            shards.append({"shard_id": len(shards), "account": acc})
+            continue
+
+        for start in range(0, len(names), max_buckets):
+            end = start + max_buckets
+            shards.append({
+                "shard_id": len(shards),
+                "account": dict(
+                    acc,
+                    start_after=names[start - 1] if start else None,
+                    # The last range stays open so buckets created since listing are covered.
+                    end_at=names[end - 1] if end < len(names) else None
+                )
+            })
+
+    return shards
+
+
+def run_location(run_id):
+    return f"{SHARD_LOCATION}/{run_id}"
+
+
+def part_location(run_id, shard_id):
+    return f"{run_location(run_id)}/part-{shard_id:05d}.json"
+
+
+def merge_marker_location(run_id):
+    # Outside the run's folder, so it is not counted as a part.
+    return f"{SHARD_LOCATION}/{run_id}.merge.json"
+
+
+def run_shard(run_id, shard, shard_count, context=None):
+    """
+    Scan one shard and write its part. With a Lambda context the scan stops
+    when the invocation's time budget runs low; the part then holds the
+    findings so far, "partial": true and the cursor it stopped at. A failed
+    scan writes a part with "error". Either way the part is written, so the
+    merge is never blocked on this shard.
+    """
+    metrics = start_run(METRICS_MODE, METRICS_NAMESPACE, SERVICE_NAME, METRICS_PATH)
+    deadline = Deadline(context, TIME_RESERVE_SECONDS * 1000) if context else None
+    accounts = [shard["account"]]
+    part = {"shard_id": shard["shard_id"], "account_id": shard["account"]["account_id"], "findings": []}
+
+    try:
+        if SCAN_MODE == "concurrent":
+            part["findings"] = scan_concurrent(accounts, deadline=deadline).to_dicts()
+        else:
+            part["findings"] = scan_sequential(accounts, deadline=deadline).to_dicts()
+    except OutOfTime as e:
+        part["findings"] = e.findings.to_dicts()
+        part["partial"] = True
+        part["cursor"] = e.cursor
+        log(30, {
+            "event": "shard_incomplete",
+            "run_id": run_id,
+            "shard_id": shard["shard_id"],
+            "account_id": shard["account"]["account_id"],
+            "cursor": e.cursor
+        })
+    except Exception as e:
+        part["error"] = str(e)
+        log(40, {
+            "run_id": run_id,
+            "shard_id": shard["shard_id"],
+            "account_id": shard["account"]["account_id"],
+            "error": str(e)
+        })
+
+    save_state(part_location(run_id, shard["shard_id"]), part)
+    metrics.flush()
+
+    # Workers finishing together may all see every part; only the one that
+    # creates the merge marker merges.
+    merged = False
+    if count_objects(run_location(run_id)) >= shard_count and create_state(
+        merge_marker_location(run_id),
+        {"run_id": run_id, "shard_id": shard["shard_id"]}
+    ):
+        merge_shards(run_id, shard_count)
+        merged = True
+
+    return {
+        "run_id": run_id,
+        "shard_id": shard["shard_id"],
+        "findings": len(part["findings"]),
+        "partial": part.get("partial", False),
+        "error": part.get("error"),
+        "merged": merged
+    }
+
+
+def shard_error(part):
+    """The part's entry in the merged run's errors, or None for a complete shard."""
+    if "error" in part:
+        return {"shard_id": part["shard_id"], "account_id": part.get("account_id"), "error": part["error"]}
+    if part.get("partial"):
+        return {
+            "shard_id": part["shard_id"],
+            "account_id": part.get("account_id"),
+            "error": "time budget exhausted",
+            "cursor": part.get("cursor")
+        }
+    return None
+
+
+def merge_shards(run_id, shard_count, streaming=REPORT_STREAMING):
+    """
+    Combine the parts into the report. Failed and partial shards are listed
+    in "errors" of the result and of a partitioned report's manifest, so they
+    are not mistaken for shards without findings.
+    """
+    errors = []
+
+    def shard_findings():
+        for shard_id in range(shard_count):
+            part = load_state(part_location(run_id, shard_id))
+            if not part:
+                errors.append({"shard_id": shard_id, "error": "part missing"})
+                continue
+            error = shard_error(part)
+            if error:
+                errors.append(error)
+            yield from (Finding.from_dict(f) for f in part.get("findings", []))
+
+    if streaming and REPORT_FORMAT == "csv":
+        sink = open_report_sink()
+        findings = FindingsStore(retain=False)
+        for f in shard_findings():
+            sink.extend((f,))
+            findings.extend((f,))
+        sink.close()
+    else:
+        findings = FindingsStore(shard_findings())
+        write_report(findings, run_id=run_id, errors=errors)
+
+    log(40 if errors else 20, {
+        "event": "shards_merged",
+        "run_id": run_id,
+        "shards": shard_count,
+        "findings": len(findings),
+        "errors": errors
+    })
+    return {"run_id": run_id, "shards": shard_count, "findings": len(findings), "errors": errors}
+
+
+def handle_worker_event(event, context=None):
+    return run_shard(event["run_id"], event["shard"], event["shard_count"], context)
+
+
+class LambdaInvoker:
+    """Dispatches each worker event as an asynchronous Lambda invocation."""
+
+    def __init__(self, function_name=WORKER_FUNCTION_NAME):
+        self.function_name = function_name
+
+    def dispatch(self, events):
+        client = get_base_client("lambda")
+        for event in events:
+            aws_retry(lambda: client.invoke(
+                FunctionName=self.function_name,
+                InvocationType="Event",
+                Payload=json.dumps(event).encode()
+            ), limiter_key=("self", "lambda", "Invoke"))
+        return None
+
+
+class LocalProcessInvoker:
+    """Runs worker events on a local process pool and waits for them."""
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+
+    def dispatch(self, events):
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(handle_worker_event, events))
+
+
+def coordinate(accounts=ACCOUNTS, invoker=None):
+    invoker = invoker or LambdaInvoker()
+    run_id = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}-{uuid.uuid4().hex[:8]}"
+
+    shards = make_shards(accounts)
+    if not shards:
+        return merge_shards(run_id, 0)
+
+    events = [
+        {"mode": "worker", "run_id": run_id, "shard_count": len(shards), "shard": shard}
+        for shard in shards
+    ]
+    log(20, {"event": "shards_dispatched", "run_id": run_id, "shards": len(shards)})
+
+    return {"run_id": run_id, "shards": len(shards), "results": invoker.dispatch(events)}
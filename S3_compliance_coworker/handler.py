@@ -1,5 +1,29 @@
+from core.budget import continue_async
 from main import run
+from config import AUTO_CONTINUE
 
 def lambda_handler(event, context):
-    return run()
+    mode = (event or {}).get("mode")
 
+    if mode in ("coordinator", "worker", "merge"):
+        import fanout
+
+        if mode == "coordinator":
+            return fanout.coordinate()
+        if mode == "worker":
+            return fanout.handle_worker_event(event, context)
+        return fanout.merge_shards(event["run_id"], event["shard_count"])
+
+    token = (event or {}).get("continuation_token")
+    result = run(context=context, continuation_token=token)
+    if isinstance(result, dict):
+        # Out of time: the checkpoint is saved, hand the token on.
+        if AUTO_CONTINUE:
+            continue_async(context, result["continuation_token"])
+        return result
+
+    if not result.retain:
+        # Streamed report: the findings are in the report only.
+        return {"status": "complete", "findings": len(result), "counts": result.counts()}
+
+    return result.to_dicts("bucket")
@@ -1,62 +1,436 @@
-from core.aws_session import assume_s3_client
-from core.retry import aws_retry
-from core.logger import get_logger
-from checks.acl_check import check_acl
-from checks.policy_check import check_policy
-from checks.pab_check import check_public_access_block
-from reporting.csv_report import generate_csv
-from reporting.s3_upload import upload_report
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from functools import partial
+
+from core.retry import configure_rate_limits, get_retry_stats, reset_retry_stats
+from core.logger import get_logger, get_metrics, start_run
+from core.budget import Deadline, OutOfTime
+from core.checkpoint_parts import FindingsPart, delete_parts, iter_parts, part_location
+from core.concurrency import interleave, iter_bounded, run_bounded
+from core.findings import Finding, FindingsStore
+from core.partitioned_report import write_partitioned
+from core.s3_upload import MultipartUpload, upload_report
+from core.state_store import delete_state, load_state, save_state
+from checks.registry import run_checks
+import object_audit
+import s3_audit
+from s3_audit import fetch_bucket_config, iter_buckets
+from reporting.csv_report import CsvReportSink, generate_csv
 from config import *
 
 log = get_logger()
 
-def run():
-    findings =[] 
+configure_rate_limits(API_RATE_LIMIT, API_BURST)
+
+STATE_VERSION = 2
+
+# Value of the audit= partition in partitioned reports.
+AUDIT = "s3"
+
+
+def list_account_buckets(acc):
+    return s3_audit.list_account_buckets(acc, ENABLED_CHECKS, ACCOUNT_PAB_SHORTCUT)
+
+
+def open_account(acc):
+    return s3_audit.open_account(acc, ENABLED_CHECKS, ACCOUNT_PAB_SHORTCUT)
+
+
+def scan_bucket(s3, account_id, name, checks, deadline=None):
+    """Bucket findings, followed by its object findings when OBJECT_AUDIT is on."""
+    findings, config = s3_audit.audit_bucket(s3, account_id, name, checks)
+    if OBJECT_AUDIT:
+        # The ACL fetched for the bucket checks names the owner; without it the object audit fetches it if needed.
+        acl = (config or {}).get("acl")
+        findings += object_audit.scan_objects(
+            s3, account_id, name, OBJECT_MIN_SIZE, OBJECT_FINDINGS_PER_BUCKET,
+            owner=acl["Owner"]["ID"] if acl else None,
+            deadline=deadline
+        )
+    return findings
+
+
+def run_tasks(tasks, mode, max_workers=MAX_WORKERS, max_per_key=MAX_WORKERS_PER_ACCOUNT):
+    if mode == "concurrent":
+        return run_bounded(tasks, max_workers, max_per_key)
+    return [fn() for _, fn in tasks]
+
+
+def scan_sequential(accounts, emit=None, deadline=None, retain=True):
+    """
+    Lists each account page by page and checks each bucket as it is
+    listed; with retain=False findings only go to emit.
+
+    With a deadline, raises OutOfTime once it passes; the cursor names the
+    account index and the last bucket finished in it.
+    """
+    findings = FindingsStore(retain=retain)
+    scanned = 0
+
+    for index, acc in enumerate(accounts):
+        if acc.get("done"):
+            continue
+        with get_metrics().span("account", acc["account_id"]):
+            s3, buckets, checks = list_account_buckets(acc)
+            last = acc.get("start_after")
+
+            for bucket in buckets:
+                # Every slice finishes at least one bucket, so a resumed scan always advances.
+                if deadline and scanned and deadline.expired():
+                    raise OutOfTime(findings, {"account": index, "start_after": last})
+
+                bucket_findings = scan_bucket(s3, acc["account_id"], bucket["Name"], checks, deadline)
+                findings.extend(bucket_findings)
+                if emit:
+                    emit(bucket_findings)
+                last = bucket["Name"]
+                scanned += 1
+
+    return findings
+
+
+def _scan_listed(index, s3, account_id, name, checks, deadline=None):
+    return index, name, scan_bucket(s3, account_id, name, checks, deadline)
+
+
+def scan_concurrent(accounts, max_workers=MAX_WORKERS, max_per_account=MAX_WORKERS_PER_ACCOUNT, emit=None, deadline=None, retain=True):
+    """
+    Streams listing -> fetch/evaluate -> emit. Bucket pages are listed only
+    as the pool drains (at most SCAN_WINDOW buckets ahead of the findings
+    emitted), and accounts are interleaved so the per-account cap does not
+    serialize the scan. emit therefore sees buckets of different accounts
+    interleaved; the returned store is in scan_sequential order.
+
+    With a deadline, raises OutOfTime when it passes. The cursor names the
+    first unfinished account and its last finished bucket, plus the last
+    finished bucket ("after") of later accounts that were started, in this
+    slice or an earlier one, and the later accounts that finished ("done").
+    """
+    # Role assumption and the account-level PAB lookup run concurrently up front.
+    opened = run_bounded(
+        [
+            (acc["account_id"], (lambda: None) if acc.get("done") else partial(open_account, acc))
+            for acc in accounts
+        ],
+        max_workers,
+        1
+    )
+
+    listed = {}
+    # Accounts run interleaved, so their "account" span (listing through the
+    # last bucket's checks) is timed by hand; it ends in whichever of
+    # account_tasks and the results loop sees the account finish.
+    started = {}
+
+    def account_finished(index):
+        get_metrics().add_span("account", (time.perf_counter() - started[index]) * 1000, accounts[index]["account_id"])
+
+    def account_tasks(index):
+        acc = accounts[index]
+        s3, checks = opened[index]
+        started[index] = time.perf_counter()
+        count = 0
+        for bucket in iter_buckets(s3, acc["account_id"], acc.get("start_after"), acc.get("end_at")):
+            yield acc["account_id"], partial(_scan_listed, index, s3, acc["account_id"], bucket["Name"], checks, deadline)
+            count += 1
+        listed[index] = count
+        if scanned[index] == count:
+            account_finished(index)
+
+    by_account = [[] for _ in accounts] if retain else None
+    emitted = FindingsStore(retain=False)
+    scanned = [0] * len(accounts)
+    last = {}
+
+    results = iter_bounded(
+        interleave(
+            (account_tasks(index) for index, acc in enumerate(accounts) if not acc.get("done")),
+            max(1, max_workers // max_per_account)
+        ),
+        max_workers,
+        max_per_account,
+        # Every slice finishes at least one bucket, so a resumed scan always advances.
+        stop=(lambda: any(scanned) and deadline.expired()) if deadline else None,
+        window=SCAN_WINDOW
+    )
+    for index, name, bucket_findings in results:
+        scanned[index] += 1
+        last[index] = name
+        if listed.get(index) == scanned[index]:
+            account_finished(index)
+        if retain:
+            by_account[index].extend(bucket_findings)
+        emitted.extend(bucket_findings)
+        if emit:
+            emit(bucket_findings)
+
+    findings = FindingsStore((f for account_findings in by_account for f in account_findings), retain=True) if retain else emitted
+
+    unfinished = [
+        index for index, acc in enumerate(accounts)
+        if not acc.get("done") and listed.get(index) != scanned[index]
+    ]
+    if unfinished:
+        first = unfinished[0]
+        cursor = {"account": first, "start_after": last.get(first, accounts[first].get("start_after"))}
+        # Accounts this slice did not advance keep the position they resumed from.
+        after = {}
+        for index in unfinished[1:]:
+            position = last.get(index, accounts[index].get("start_after"))
+            if position is not None:
+                after[str(index)] = position
+        done = [index for index in range(first + 1, len(accounts)) if index not in unfinished]
+        if after:
+            cursor["after"] = after
+        if done:
+            cursor["done"] = done
+        raise OutOfTime(findings, cursor)
+
+    return findings
+
+
+def rescan_bucket(s3, account_id, name, checks, created, previous, now):
+    """
+    Fetch and evaluate one bucket for the incremental state.
+    On failure the previous entry (if any) is kept so the bucket is
+    retried on the next run and its last known findings still reported.
+    """
+    try:
+        config = fetch_bucket_config(s3, account_id, name, checks)
+    except Exception as e:
+        log(40, {
+            "account_id": account_id,
+            "bucket": name,
+            "error": str(e)
+        })
+        return previous
+
+    return {
+        "created": created,
+        "checks": [check.name for check in checks],
+        "checked_at": now.isoformat(),
+        "issues": list(run_checks(checks, config))
+    }
+
 
-    for acc in ACCOUNTS:
-        s3 =assume_s3_client(acc["role_arn"])
+def scan_incremental(accounts, state, mode=SCAN_MODE, full_rescan_age=timedelta(hours=FULL_RESCAN_HOURS), emit=None):
+    """
+    Re-check only new or re-created buckets and buckets whose last check is
+    older than full_rescan_age; everything else reuses the findings stored
+    in state. Returns (findings, new_state).
+    """
+    now = datetime.now(timezone.utc)
+    # Version 1 state stored issue messages rather than codes; rescan everything once.
+    previous_buckets = state.get("buckets", {}) if state.get("version") == STATE_VERSION else {}
 
-        buckets = aws_retry(lamdbda: s3.list_buckets()["Buckets"])
+    listings = run_tasks(
+        [(acc["account_id"], partial(list_account_buckets, acc)) for acc in accounts],
+        mode,
+        max_per_key=1
+    )
 
+    plan, tasks, skipped = [], [], 0
+    for acc, (s3, buckets, checks) in zip(accounts, listings):
+        account_id = acc["account_id"]
         for bucket in buckets:
             name = bucket["Name"]
+            key = f"{account_id}/{name}"
+            created = str(bucket.get("CreationDate"))
+            previous = previous_buckets.get(key)
+
+            if (
+                previous
+                and previous["created"] == created
+                and previous.get("checks") == [check.name for check in checks]
+                and now - datetime.fromisoformat(previous["checked_at"]) < full_rescan_age
+            ):
+                plan.append((key, account_id, name, previous))
+                skipped += 1
+            else:
+                plan.append((key, account_id, name, None))
+                tasks.append((account_id, partial(rescan_bucket, s3, account_id, name, checks, created, previous, now)))
+
+    rescanned = iter(run_tasks(tasks, mode))
+
+    findings = FindingsStore()
+    new_buckets = {}
+    for key, account_id, name, cached in plan:
+        entry = cached if cached is not None else next(rescanned)
+        if entry is None:
+            continue
+        new_buckets[key] = entry
+        bucket_findings = [Finding(account_id, name, code) for code in entry["issues"]]
+        findings.extend(bucket_findings)
+        if emit and bucket_findings:
+            emit(bucket_findings)
+
+    log(20, {"event": "incremental_scan", "buckets": len(plan), "skipped": skipped})
+
+    return findings, {"version": STATE_VERSION, "buckets": new_buckets}
+
+
+def open_report_sink(checked_at=None):
+    if REPORT_COMPRESS:
+        upload = MultipartUpload(REPORT_BUCKET, REPORT_KEY + ".gz", content_type="application/gzip")
+    else:
+        upload = MultipartUpload(REPORT_BUCKET, REPORT_KEY)
+    return CsvReportSink(upload, compress=REPORT_COMPRESS, checked_at=checked_at)
+
+
+def write_report(findings, checked_at=None, run_id=None, errors=()):
+    """
+    The whole report in REPORT_FORMAT (used when it is not streamed).
+    errors go into the partitioned report's manifest; a CSV report has none.
+    """
+    checked_at = checked_at or datetime.utcnow().isoformat()
+    if REPORT_FORMAT == "csv":
+        upload_report(REPORT_BUCKET, REPORT_KEY, generate_csv(findings, checked_at))
+        return
+    write_partitioned(
+        findings,
+        REPORT_LOCATION,
+        AUDIT,
+        run_id or uuid.uuid4().hex,
+        checked_at,
+        REPORT_FORMAT,
+        accounts=[acc["account_id"] for acc in ACCOUNTS],
+        errors=errors
+    )
+
+
+def checkpoint_location(continuation_token):
+    return f"{CHECKPOINT_LOCATION}/{continuation_token}.json"
+
+
+def checkpoint_parts_prefix(continuation_token):
+    return f"{CHECKPOINT_LOCATION}/{continuation_token}"
+
+
+def resume_accounts(accounts, cursor):
+    """
+    The accounts with a checkpoint cursor applied: accounts before the
+    cursor's and those it lists as done are marked done, the others start
+    after their last finished bucket.
+    """
+    first = cursor["account"]
+    after = {int(index): name for index, name in cursor.get("after", {}).items()}
+    after[first] = cursor.get("start_after")
+    done = set(cursor.get("done", ()))
+
+    resumed = []
+    for index, acc in enumerate(accounts):
+        acc = dict(acc)
+        if index < first or index in done:
+            acc["done"] = True
+        elif after.get(index) is not None:
+            acc["start_after"] = after[index]
+        resumed.append(acc)
+    return resumed
+
+
+def run(mode=SCAN_MODE, incremental=INCREMENTAL, streaming=REPORT_STREAMING, context=None, continuation_token=None):
+    """
+    One audit, or one slice of it when context is given: the scan stops when
+    the invocation's time budget runs low, checkpoints its progress and
+    returns {"status": "incomplete", "continuation_token": ...}. Passing that
+    token back resumes the scan; the final slice writes the whole report.
+    Incremental runs only rescan changed buckets and are not sliced.
+    """
+    metrics = start_run(METRICS_MODE, METRICS_NAMESPACE, SERVICE_NAME, METRICS_PATH)
+    reset_retry_stats()
+
+    checkpoint = None
+    if continuation_token:
+        checkpoint = load_state(checkpoint_location(continuation_token))
+        if not checkpoint:
+            raise ValueError(f"No checkpoint for continuation token {continuation_token}")
+
+    checked_at = checkpoint["checked_at"] if checkpoint else datetime.utcnow().isoformat()
+    deadline = Deadline(context, TIME_RESERVE_SECONDS * 1000) if context and not incremental else None
+
+    # Only the CSV report is streamed; partitioned formats are written per account at the end.
+    sink = open_report_sink(checked_at) if streaming and REPORT_FORMAT == "csv" else None
+    emit = sink.extend if sink else None
+    # A streamed report needs no findings in memory.
+    retain = not sink
+
+    if checkpoint and "counts" in checkpoint:
+        findings = FindingsStore.from_counts(checkpoint["counts"])
+    else:
+        findings = FindingsStore(
+            (Finding.from_dict(f) for f in checkpoint["findings"]) if checkpoint else (),
+            retain=retain
+        )
+    accounts = resume_accounts(ACCOUNTS, checkpoint["cursor"]) if checkpoint else ACCOUNTS
+    if sink and checkpoint:
+        sink.extend(Finding.from_dict(f) for f in checkpoint["findings"])
+
+    # A sliced, streamed run writes each slice's findings to a part next to
+    # its checkpoint; the slice that completes streams all parts into the report.
+    part, parts = None, 0
+    if sink and deadline:
+        continuation_token = continuation_token or uuid.uuid4().hex
+        parts = checkpoint.get("parts", 0) if checkpoint else 0
+        part = FindingsPart(part_location(checkpoint_parts_prefix(continuation_token), parts + 1))
+        emit = part.extend
+
+    try:
+        if incremental:
+            scanned, state = scan_incremental(accounts, load_state(STATE_LOCATION), mode, emit=emit)
+            save_state(STATE_LOCATION, state)
+        elif mode == "concurrent":
+            scanned = scan_concurrent(accounts, emit=emit, deadline=deadline, retain=retain)
+        else:
+            scanned = scan_sequential(accounts, emit=emit, deadline=deadline, retain=retain)
+    except OutOfTime as e:
+        if sink:
+            sink.abort()
+        findings.extend(e.findings)
+        continuation_token = continuation_token or uuid.uuid4().hex
+        cursor = e.cursor
+        state = {
+            "version": 1,
+            "checked_at": checked_at,
+            "cursor": cursor,
+            "findings": findings.to_dicts()
+        }
+        if part:
+            part.close()
+            state.update(parts=parts + 1, counts=findings.counts())
+        save_state(checkpoint_location(continuation_token), state)
+        log(20, {"event": "checkpoint_saved", "continuation_token": continuation_token, "cursor": cursor, "findings": len(findings)})
+        metrics.flush()
+        return {"status": "incomplete", "continuation_token": continuation_token, "findings": len(findings)}
+    except Exception:
+        if sink:
+            sink.abort()
+        if part:
+            part.abort()
+        raise
+
+    findings.extend(scanned)
+    if checkpoint and retain:
+        # A concurrent slice may have stopped part-way through several accounts; restore account order.
+        position = {acc["account_id"]: index for index, acc in enumerate(ACCOUNTS)}
+        findings = FindingsStore(sorted(findings, key=lambda f: position.get(f.account_id, len(position))))
+
+    if part:
+        part.close()
+        parts += 1
+        sink.extend(iter_parts(checkpoint_parts_prefix(continuation_token), parts))
+
+    if sink:
+        sink.close()
+    else:
+        write_report(findings, checked_at, continuation_token)
+
+    if part:
+        delete_parts(checkpoint_parts_prefix(continuation_token), parts)
+    if continuation_token:
+        delete_state(checkpoint_location(continuation_token))
 
-            try:
-                acl = aws_retry(lambda:s3.get_bucket_acl(Bucket = name))
-                acl_hit, acl_msg = check_acl(acl)
-                try:
-                    pab = aws_retry(lambda:s3.get_public_access_block(Bucket = name)["PublicAccessBlockConfiguration"])
-                except s3.exceptions.NoSuchPublicAccessBlockConfiguration:
-                    pab : {}
-
-                    pab_hit , pab_msg = check_public_access_block(pab)
-
-                try:
-                    policy = aws_retry(
-                        lambda: s3.get_bucket_policy(Bucket=name)["Policy"]
-                    )
-                    pol_hit, pol_msg = check_policy(policy)
-                except s3.exceptions.NoSuchBucketPolicy:
-                    pol_hit, pol_msg = False, None
-
-                for hit, msg in [
-                    (acl_hit, acl_msg),
-                    (pab_hit, pab_msg),
-                    (pol_hit, pol_msg)
-                ]:
-                    if hit:
-                        findings.append({
-                            "account_id": acc["account_id"],
-                            "bucket": name,
-                            "issue": msg
-                        })
-
-            except Exception as e:
-                log(40, {
-                    "bucket": name,
-                    "error": str(e)
-                })
-    csv_data = generate_csv(findings)
-    upload_report(REPORT_BUCKET, REPORT_KEY, csv_data)
+    log(20, {"event": "retry_stats", **get_retry_stats()})
+    metrics.flush()
 
     return findings
@@ -0,0 +1,246 @@
+"""
+Object-level exposure audit of one bucket from its S3 Inventory report,
+independent of config.py like s3_audit. The cost is reading the latest
+inventory delivery (manifest.json plus CSV, ORC or Parquet data files),
+not one API call per object.
+
+ORC and Parquet reports need pyarrow. CSV reports are read with pyarrow's
+streaming CSV reader when it is installed (vectorized filtering) and with
+the csv module otherwise.
+"""
+
+import csv
+import gzip
+import importlib.util
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+from collections import Counter
+from urllib.parse import unquote_plus
+
+from core.findings import Finding, format_issue
+from core.logger import get_logger, get_metrics
+from core.retry import aws_retry
+from checks.object_checks import FIELDS, OBJECT_SCAN_INCOMPLETE, OBJECTS_NOT_LISTED, select_arrow, select_rows
+
+log = get_logger()
+
+# Rows per batch handed to the object checks.
+BATCH_ROWS = 65536
+
+# Inventory deliveries land in timestamped folders, e.g. 2024-01-31T01-00Z/.
+DELIVERY_FOLDER = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}-\d{2}Z/$")
+
+
+def _canonical(name):
+    return name.replace("_", "").replace(" ", "").lower()
+
+
+CANONICAL_FIELDS = {_canonical(field): field for field in FIELDS}
+
+
+def _call(account_id, api, fn):
+    return aws_retry(fn, limiter_key=(account_id, "s3", api))
+
+
+def find_inventory(s3, account_id, bucket):
+    """
+    (destination bucket, manifest) of the bucket's latest inventory
+    delivery, or None when it has no enabled inventory configuration or
+    nothing has been delivered yet. Of several configurations, the one
+    reporting most of the fields the checks read is used.
+    """
+    configs = _call(account_id, "ListBucketInventoryConfigurations", lambda: s3.list_bucket_inventory_configurations(
+        Bucket=bucket
+    )).get("InventoryConfigurationList", [])
+    configs = [config for config in configs if config.get("IsEnabled")]
+    if not configs:
+        return None
+
+    config = max(configs, key=lambda c: len({_canonical(f) for f in c.get("OptionalFields", [])} & set(CANONICAL_FIELDS)))
+    destination = config["Destination"]["S3BucketDestination"]
+    destination_bucket = destination["Bucket"].split(":::")[-1]
+    base = "/".join(part for part in (destination.get("Prefix", "").strip("/"), bucket, config["Id"]) if part) + "/"
+
+    latest, token = None, None
+    while True:
+        params = {"Bucket": destination_bucket, "Prefix": base, "Delimiter": "/"}
+        if token:
+            params["ContinuationToken"] = token
+        page = _call(account_id, "ListObjectsV2", lambda: s3.list_objects_v2(**params))
+        for prefix in page.get("CommonPrefixes", []):
+            if DELIVERY_FOLDER.search(prefix["Prefix"]) and (latest is None or prefix["Prefix"] > latest):
+                latest = prefix["Prefix"]
+        token = page.get("NextContinuationToken")
+        if not token:
+            break
+
+    if latest is None:
+        return None
+
+    body = _call(account_id, "GetObject", lambda: s3.get_object(
+        Bucket=destination_bucket,
+        Key=latest + "manifest.json"
+    ))["Body"].read()
+    return destination_bucket, json.loads(body)
+
+
+def _csv_batches(stream, schema):
+    """Column-list batches of a gzipped, headerless inventory CSV, without pyarrow."""
+    wanted = {index: CANONICAL_FIELDS[_canonical(name)] for index, name in enumerate(schema)
+              if _canonical(name) in CANONICAL_FIELDS}
+    columns = {field: [] for field in wanted.values()}
+
+    for row in csv.reader(io.TextIOWrapper(gzip.GzipFile(fileobj=stream), encoding="utf-8", newline="")):
+        for index, field in wanted.items():
+            columns[field].append(row[index] if index < len(row) else "")
+        if len(columns["Key"]) >= BATCH_ROWS:
+            yield columns
+            columns = {field: [] for field in wanted.values()}
+    if columns["Key"]:
+        yield columns
+
+
+def _arrow_batches(stream, file_format, schema):
+    """pyarrow record batches with FIELDS column names, read in bounded chunks."""
+    import pyarrow as pa
+
+    def renamed(batches):
+        for batch in batches:
+            yield pa.RecordBatch.from_arrays(
+                batch.columns,
+                names=[CANONICAL_FIELDS[_canonical(name)] for name in batch.schema.names]
+            )
+
+    if file_format == "CSV":
+        from pyarrow import csv as pa_csv
+
+        include = [name for name in schema if _canonical(name) in CANONICAL_FIELDS]
+        yield from renamed(pa_csv.open_csv(
+            gzip.GzipFile(fileobj=stream),
+            read_options=pa_csv.ReadOptions(column_names=schema, block_size=8 * 1024 * 1024),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=include,
+                column_types={name: pa.string() for name in include}
+            )
+        ))
+        return
+
+    # Columnar files need random access: spool to local disk, then read one
+    # row group (Parquet) or stripe (ORC) at a time.
+    spool = tempfile.NamedTemporaryFile(suffix="." + file_format.lower(), delete=False)
+    try:
+        with spool:
+            shutil.copyfileobj(stream, spool, 1024 * 1024)
+        if file_format == "Parquet":
+            import pyarrow.parquet as pq
+
+            parquet = pq.ParquetFile(spool.name)
+            names = [name for name in parquet.schema_arrow.names if _canonical(name) in CANONICAL_FIELDS]
+            yield from renamed(parquet.iter_batches(batch_size=BATCH_ROWS, columns=names))
+        else:
+            from pyarrow import orc
+
+            orc_file = orc.ORCFile(spool.name)
+            names = [name for name in orc_file.schema.names if _canonical(name) in CANONICAL_FIELDS]
+            yield from renamed(orc_file.read_stripe(index, columns=names) for index in range(orc_file.nstripes))
+    finally:
+        os.remove(spool.name)
+
+
+def _arrow_available():
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def iter_selected(s3, account_id, destination_bucket, manifest, data_file, bucket_owner, min_size):
+    """
+    {code: (keys, sizes)} per batch of one of the manifest's data files,
+    streamed from S3 and read BATCH_ROWS rows at a time.
+    """
+    file_format = manifest["fileFormat"]
+    if file_format != "CSV" and not _arrow_available():
+        raise RuntimeError(f"{file_format} inventory reports need pyarrow")
+    schema = [name.strip() for name in manifest.get("fileSchema", "").split(",")]
+    use_arrow = _arrow_available()
+
+    stream = _call(account_id, "GetObject", lambda: s3.get_object(
+        Bucket=destination_bucket,
+        Key=data_file["key"]
+    ))["Body"]
+
+    if use_arrow:
+        for batch in _arrow_batches(stream, file_format, schema):
+            yield select_arrow(batch, bucket_owner, min_size)
+    else:
+        for columns in _csv_batches(stream, schema):
+            yield select_rows(columns, bucket_owner, min_size)
+
+
+def bucket_owner_id(s3, account_id, bucket):
+    return _call(account_id, "GetBucketAcl", lambda: s3.get_bucket_acl(Bucket=bucket))["Owner"]["ID"]
+
+
+def scan_objects(s3, account_id, bucket, min_size=0, max_findings=1000, owner=None, deadline=None):
+    """
+    Object findings for one bucket from its latest inventory report, at
+    most max_findings per issue; the remainder of each issue is counted in
+    one bucket-level S3_OBJECTS_NOT_LISTED finding. Buckets without an
+    enabled inventory are skipped.
+
+    owner is the bucket owner's canonical ID, normally taken from the ACL
+    already fetched for the bucket checks. When it is not given and the
+    report lists object owners, it is looked up with GetBucketAcl.
+
+    With a core.budget.Deadline, no further data file is read once it has
+    passed; one S3_OBJECT_SCAN_INCOMPLETE finding names the first file left
+    unread, so a large inventory cannot outrun the invocation.
+    """
+    try:
+        with get_metrics().span("object_inventory", account_id):
+            inventory = find_inventory(s3, account_id, bucket)
+            if inventory is None:
+                return []
+            destination_bucket, manifest = inventory
+
+            if owner is None and "objectowner" in _canonical(manifest.get("fileSchema", "")):
+                owner = bucket_owner_id(s3, account_id, bucket)
+            # CSV reports URL-encode object keys.
+            decode = unquote_plus if manifest["fileFormat"] == "CSV" else str
+
+            findings, listed, overflow = [], Counter(), Counter()
+            stopped = None
+            for index, data_file in enumerate(manifest["files"]):
+                if deadline and deadline.expired():
+                    stopped = index
+                    break
+                for selected in iter_selected(s3, account_id, destination_bucket, manifest, data_file, owner, min_size):
+                    for code, (keys, sizes) in selected.items():
+                        room = max_findings - listed[code]
+                        for key, size in zip(keys[:room], sizes[:room]):
+                            findings.append(Finding(account_id, f"{bucket}/{decode(key)}", code, params={"size": size}))
+                        listed[code] += min(room, len(keys))
+                        overflow[code] += len(keys) - min(room, len(keys))
+
+        for code, count in overflow.items():
+            if not count:
+                continue
+            findings.append(Finding(account_id, bucket, OBJECTS_NOT_LISTED, params={
+                "count": count,
+                "issue": format_issue(code)
+            }))
+        if stopped is not None:
+            findings.append(Finding(account_id, bucket, OBJECT_SCAN_INCOMPLETE, params={
+                "file": stopped + 1,
+                "files": len(manifest["files"])
+            }))
+        return findings
+    except Exception as e:
+        log(40, {
+            "account_id": account_id,
+            "bucket": bucket,
+            "error": f"object inventory scan failed: {e}"
+        })
+        return []
@@ -2,24 +2,43 @@ import csv
 import io
 from datetime import datetime
 
-def generate_csv(findings):
+from core.csv_sink import CsvSink
+
+HEADER = [
+    "AccountId",
+    "Bucket",
+    "Issue",
+    "CheckedAt"
+]
+
+
+def _row(f, checked_at):
+    return [
+        f.account_id,
+        f.resource,
+        f.issue,
+        checked_at
+    ]
+
+
+def generate_csv(findings, checked_at=None):
+    checked_at = checked_at or datetime.utcnow().isoformat()
+
     buffer = io.StringIO()
     writer = csv.writer(buffer)
 
-    writer.writerow([
-        "AccountId",
-        "Bucket",
-        "Issue",
-        "CheckedAt"
-    ])
+    writer.writerow(HEADER)
 
     for f in findings:
-        writer.writerow([
-            f["account_id"],
-            f["bucket"],
-            f["issue"],
-            datetime.utcnow().isoformat()
-        ])
+        writer.writerow(_row(f, checked_at))
 
     return buffer.getvalue()
 
+
+class CsvReportSink(CsvSink):
+    """Streaming form of generate_csv; see core.csv_sink.CsvSink."""
+
+    header = HEADER
+
+    def row(self, finding):
+        return _row(finding, self.checked_at)
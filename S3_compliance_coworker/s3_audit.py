@@ -0,0 +1,109 @@
+"""
+S3 public access audit of one account, independent of config.py so the
+coworker (main.py) and the combined audit runner can both drive it.
+"""
+
+from core.aws_session import assume_s3_client, get_client
+from core.findings import Finding
+from core.logger import get_logger, get_metrics
+from core.retry import aws_retry
+from checks.registry import (
+    account_pab_blocks_all,
+    fetch_resources,
+    plan_resources,
+    run_checks,
+    select_checks,
+)
+
+log = get_logger()
+
+# ListBuckets page size (MaxBuckets, at most 10000).
+BUCKET_PAGE_SIZE = 1000
+
+
+def account_checks(acc, enabled_checks, pab_shortcut=True):
+    """Checks to run for this account's buckets."""
+    blocked = False
+    if pab_shortcut:
+        try:
+            s3control = get_client(acc["role_arn"], "s3control", "us-east-1")
+            blocked = account_pab_blocks_all(s3control, acc["account_id"])
+        except Exception as e:
+            log(40, {
+                "account_id": acc["account_id"],
+                "error": f"account public access block lookup failed: {e}"
+            })
+    return select_checks(enabled_checks, account_pab_blocks_all=blocked)
+
+
+def iter_buckets(s3, account_id, start_after=None, end_at=None, page_size=BUCKET_PAGE_SIZE):
+    """
+    Buckets of one account, one ListBuckets page (MaxBuckets) at a time,
+    limited to the bucket-name range (start_after, end_at] of a shard or
+    a resumed scan. Only the current page is held in memory.
+    """
+    token = None
+    while True:
+        params = {"MaxBuckets": page_size}
+        if token:
+            params["ContinuationToken"] = token
+        page = aws_retry(
+            lambda: s3.list_buckets(**params),
+            limiter_key=(account_id, "s3", "ListBuckets")
+        )
+
+        for bucket in page.get("Buckets", []):
+            name = bucket["Name"]
+            if (start_after is None or name > start_after) and (end_at is None or name <= end_at):
+                yield bucket
+
+        token = page.get("ContinuationToken")
+        if not token:
+            return
+
+
+def open_account(acc, enabled_checks, pab_shortcut=True):
+    """(s3 client, checks) for one account."""
+    with get_metrics().span("assume_role", acc["account_id"]):
+        s3 = assume_s3_client(acc["role_arn"])
+    return s3, account_checks(acc, enabled_checks, pab_shortcut)
+
+
+def list_account_buckets(acc, enabled_checks, pab_shortcut=True):
+    """
+    (s3 client, buckets, checks); buckets is a lazy iterator over the
+    account's bucket-name range (see iter_buckets).
+    """
+    s3, checks = open_account(acc, enabled_checks, pab_shortcut)
+    # Shards of very large accounts carry a bucket-name range (start_after, end_at].
+    buckets = iter_buckets(s3, acc["account_id"], acc.get("start_after"), acc.get("end_at"))
+    return s3, buckets, checks
+
+
+def fetch_bucket_config(s3, account_id, name, checks):
+    # Keyed by account so the metrics summary names the slowest accounts.
+    with get_metrics().span("bucket", account_id):
+        return fetch_resources(s3, account_id, name, plan_resources(checks))
+
+
+def evaluate_bucket(account_id, name, config, checks):
+    return [Finding(account_id, name, code) for code in run_checks(checks, config)]
+
+
+def audit_bucket(s3, account_id, name, checks):
+    """(findings, config) of one bucket; a failed bucket is logged and gives ([], None)."""
+    try:
+        config = fetch_bucket_config(s3, account_id, name, checks)
+        return evaluate_bucket(account_id, name, config, checks), config
+    except Exception as e:
+        log(40, {
+            "account_id": account_id,
+            "bucket": name,
+            "error": str(e)
+        })
+        return [], None
+
+
+def scan_bucket(s3, account_id, name, checks):
+    return audit_bucket(s3, account_id, name, checks)[0]
+
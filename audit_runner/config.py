@@ -0,0 +1,112 @@
+import os
+import json
+from datetime import datetime, timezone
+
+# Parsed and validated once per container (module import); a bad setting
+# fails the first invocation with one clear message instead of mid-scan.
+
+
+def _required(name):
+    value = os.environ.get(name, "").strip()
+    if not value:
+        raise ValueError(f"{name} must be set")
+    return value
+
+
+def _choice(name, default, choices):
+    value = os.environ.get(name, default)
+    if value not in choices:
+        raise ValueError(f"{name} must be one of {', '.join(choices)}, got {value!r}")
+    return value
+
+
+def _timestamp(name):
+    """An optional ISO 8601 time as naive UTC (no offset means UTC)."""
+    value = os.environ.get(name, "").strip()
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 timestamp, got {value!r}")
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _list(name, default):
+    return [item.strip() for item in os.environ.get(name, default).split(",") if item.strip()]
+
+
+def _accounts(fields):
+    try:
+        accounts = json.loads(_required("ACCOUNTS_JSON"))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"ACCOUNTS_JSON is not valid JSON: {e}")
+    if not isinstance(accounts, list):
+        raise ValueError("ACCOUNTS_JSON must be a JSON list of accounts")
+    for index, acc in enumerate(accounts):
+        missing = [field for field in fields if not isinstance(acc, dict) or field not in acc]
+        if missing:
+            raise ValueError(f"ACCOUNTS_JSON[{index}] is missing {', '.join(missing)}")
+    return accounts
+
+
+SERVICE_NAME = "compliance-audit-runner"
+
+# Audits to run against every account, in report order.
+AUDITS = _list("AUDITS", "s3,rds")
+for _audit in AUDITS:
+    if _audit not in ("s3", "rds"):
+        raise ValueError(f"AUDITS entries must be s3 or rds, got {_audit!r}")
+
+# One role per account serves every audit; "regions" is only read by the RDS audit.
+ACCOUNTS = _accounts(("account_id", "role_arn", "regions") if "rds" in AUDITS else ("account_id", "role_arn"))
+# Example:
+# [
+#   {
+#     "account_id": "111111111111",
+#     "role_arn": "arn:aws:iam::111111111111:role/SecurityAuditRole",
+#     "regions": ["us-east-1"]
+#   }
+# ]
+
+REPORT_BUCKET = _required("REPORT_BUCKET")
+REPORT_KEY = os.environ.get("REPORT_KEY", "combined_audit.csv")
+
+# S3 audit: checks from checks.registry and the account-level PAB shortcut.
+ENABLED_CHECKS = _list("ENABLED_CHECKS", "acl,public_access_block,policy")
+ACCOUNT_PAB_SHORTCUT = os.environ.get("ACCOUNT_PAB_SHORTCUT", "true").lower() == "true"
+
+# RDS audit: automated snapshots older than this are reported.
+RETENTION_DAYS = int(os.environ.get("RETENTION_DAYS", "30"))
+# Snapshot ages are measured at the run's start (its CheckedAt); AUDIT_AS_OF
+# measures them at another time, e.g. to repeat a past audit.
+AUDIT_AS_OF = _timestamp("AUDIT_AS_OF")
+
+# Audit units (one S3 unit per bucket, one RDS unit per account/region)
+# share one pool; MAX_WORKERS_PER_ACCOUNT caps the units in flight per account.
+MAX_WORKERS = int(os.environ.get("MAX_WORKERS", "16"))
+MAX_WORKERS_PER_ACCOUNT = int(os.environ.get("MAX_WORKERS_PER_ACCOUNT", "4"))
+
+# Shared token bucket per (account, service, api) used by core.retry.aws_retry.
+API_RATE_LIMIT = float(os.environ.get("API_RATE_LIMIT", "50"))
+API_BURST = int(os.environ.get("API_BURST", "50"))
+
+# Stream the report through S3 multipart upload as findings are produced
+# instead of building it in memory; REPORT_COMPRESS gzips it (key gets ".gz").
+REPORT_STREAMING = os.environ.get("REPORT_STREAMING", "false").lower() == "true"
+REPORT_COMPRESS = os.environ.get("REPORT_COMPRESS", "false").lower() == "true"
+
+# Report output: "csv" overwrites REPORT_KEY on every run. "parquet" and
+# "jsonl" instead add one file per account and run under
+# REPORT_LOCATION/dt=/account=/audit=/ plus a run manifest, for Athena;
+# "parquet" falls back to gzipped JSON lines when pyarrow is not installed.
+REPORT_FORMAT = _choice("REPORT_FORMAT", "csv", ("csv", "parquet", "jsonl"))
+REPORT_LOCATION = os.environ.get("REPORT_LOCATION", f"s3://{REPORT_BUCKET}/findings")
+
+# Run instrumentation: "emf" writes CloudWatch Embedded Metric Format lines
+# at the end of each run, "json" writes METRICS_PATH, "off" disables it.
+METRICS_MODE = _choice("METRICS_MODE", "emf", ("emf", "json", "off"))
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "DigitalCoworker")
+METRICS_PATH = os.environ.get("METRICS_PATH", "metrics.json")
@@ -0,0 +1,9 @@
+from main import run
+
+def lambda_handler(event, context):
+    result = run()
+
+    return {
+        "counts": result["counts"],
+        "errors": result["errors"]
+    }
@@ -0,0 +1,211 @@
+"""
+Runs the S3 and RDS audits in one pass over the accounts. Both audits go
+through the same core.aws_session and core.retry caches, so each role is
+assumed once and each (account, service) client and rate limiter is
+shared, instead of once per coworker.
+"""
+
+import os
+import sys
+import uuid
+from datetime import datetime, timezone
+from functools import partial
+
+# In the repository the audit modules live in the sibling coworker
+# directories; a deployment package puts them next to this file instead.
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _coworker in ("S3_compliance_coworker", "rds_digital_coworker"):
+    if os.path.isdir(os.path.join(_ROOT, _coworker)):
+        sys.path.append(os.path.join(_ROOT, _coworker))
+
+from core.concurrency import interleave, iter_bounded, run_bounded
+from core.logger import get_logger, get_metrics, start_run
+from core.partitioned_report import write_partitioned
+from core.retry import configure_rate_limits, get_retry_stats, reset_retry_stats
+from core.s3_upload import MultipartUpload, upload_report
+from reporting.combined_report import CombinedReportSink, generate_csv
+from config import *
+
+log = get_logger()
+
+configure_rate_limits(API_RATE_LIMIT, API_BURST)
+
+
+def open_report_sink(checked_at=None):
+    if REPORT_COMPRESS:
+        upload = MultipartUpload(REPORT_BUCKET, REPORT_KEY + ".gz", content_type="application/gzip")
+    else:
+        upload = MultipartUpload(REPORT_BUCKET, REPORT_KEY)
+    return CombinedReportSink(upload, compress=REPORT_COMPRESS, checked_at=checked_at)
+
+
+def write_report(findings, audits, checked_at):
+    """findings: (audit, Finding) pairs; one partitioned dataset per audit, or one combined CSV."""
+    if REPORT_FORMAT == "csv":
+        upload_report(REPORT_BUCKET, REPORT_KEY, generate_csv(findings, checked_at))
+        return
+
+    run_id = uuid.uuid4().hex
+    for audit in audits:
+        write_partitioned(
+            (f for finding_audit, f in findings if finding_audit == audit),
+            REPORT_LOCATION,
+            audit,
+            run_id,
+            checked_at,
+            REPORT_FORMAT,
+            accounts=[acc["account_id"] for acc in ACCOUNTS]
+        )
+
+
+def open_s3_account(acc):
+    """(s3 client, checks), or the exception that stopped the account from being opened."""
+    import s3_audit
+
+    try:
+        return s3_audit.open_account(acc, ENABLED_CHECKS, ACCOUNT_PAB_SHORTCUT)
+    except Exception as e:
+        return e
+
+
+def _fail(error):
+    raise error
+
+
+def s3_units(acc, opened):
+    """
+    One unit per bucket of the account, listed page by page as the pool
+    drains. An account that cannot be opened or listed ends in one failing
+    unit, so the error is reported like any other.
+    """
+    import s3_audit
+
+    if isinstance(opened, Exception):
+        yield "s3", acc, "", partial(_fail, opened)
+        return
+    s3, checks = opened
+    try:
+        for bucket in s3_audit.iter_buckets(s3, acc["account_id"]):
+            yield "s3", acc, "", partial(s3_audit.scan_bucket, s3, acc["account_id"], bucket["Name"], checks)
+    except Exception as e:
+        yield "s3", acc, "", partial(_fail, e)
+
+
+def scan_rds(acc, region, source, now):
+    import rds_audit
+
+    return rds_audit.scan_region(acc, region, source, RETENTION_DAYS, now)
+
+
+def account_units(acc, audits, opened, source, now):
+    for audit in audits:
+        if audit == "s3":
+            yield from s3_units(acc, opened)
+        else:
+            for region in acc["regions"]:
+                yield "rds", acc, region, partial(scan_rds, acc, region, source, now)
+
+
+def audit_units(accounts, audits, now=None):
+    """
+    (audit, acc, region, fn) for every unit of work: S3 units are single
+    buckets, RDS units account/regions. Accounts are interleaved so the
+    per-account cap does not serialize the pool. RDS snapshot ages are
+    measured at now.
+    """
+    source = None
+    if "rds" in audits:
+        from sources.live import LiveSource
+
+        source = LiveSource()
+
+    opened = [None] * len(accounts)
+    if "s3" in audits:
+        # Roles are assumed and account PAB looked up concurrently, up front.
+        opened = run_bounded(
+            [(acc["account_id"], partial(open_s3_account, acc)) for acc in accounts],
+            MAX_WORKERS,
+            1
+        )
+
+    return interleave(
+        (account_units(acc, audits, opened[index], source, now) for index, acc in enumerate(accounts)),
+        max(1, MAX_WORKERS // MAX_WORKERS_PER_ACCOUNT)
+    )
+
+
+def run_unit(audit, acc, region, scan):
+    """(audit, findings, error) for one unit; never raises."""
+    name = f"{audit}:{acc['account_id']}/{region}" if region else f"{audit}:{acc['account_id']}"
+    try:
+        with get_metrics().span("unit", name):
+            return audit, scan(), None
+    except Exception as e:
+        error = {
+            "audit": audit,
+            "account_id": acc["account_id"],
+            "error": str(e)
+        }
+        if region:
+            error["region"] = region
+        log(40, dict(error))
+        return audit, [], error
+
+
+def run(audits=AUDITS, streaming=REPORT_STREAMING):
+    """
+    One combined audit. Returns {"findings": [(audit, Finding), ...],
+    "counts": {audit: n}, "errors": [...]}; the report has one row per
+    finding, in account order. A streamed report keeps no findings, so
+    "findings" is then empty, and its rows of the accounts in flight
+    together are interleaved.
+    """
+    metrics = start_run(METRICS_MODE, METRICS_NAMESPACE, SERVICE_NAME, METRICS_PATH)
+    reset_retry_stats()
+
+    checked_at = (AUDIT_AS_OF or datetime.utcnow()).isoformat()
+    # Only the CSV report is streamed; partitioned formats are written per account at the end.
+    sink = open_report_sink(checked_at) if streaming and REPORT_FORMAT == "csv" else None
+    findings, errors = [], []
+    counts = {audit: 0 for audit in audits}
+
+    def collect(result):
+        audit, unit_findings, error = result
+        pairs = [(audit, f) for f in unit_findings]
+        counts[audit] += len(pairs)
+        # A streamed report keeps no findings in memory.
+        if sink:
+            sink.extend(pairs)
+        else:
+            findings.extend(pairs)
+        if error:
+            errors.append(error)
+
+    # One pool for every bucket and region: MAX_WORKERS caps the whole run and
+    # MAX_WORKERS_PER_ACCOUNT each account. Listing runs at most the window ahead.
+    for result in iter_bounded(
+        (
+            ((("account", acc["account_id"]),), partial(run_unit, audit, acc, region, scan))
+            for audit, acc, region, scan in audit_units(
+                ACCOUNTS, audits, datetime.fromisoformat(checked_at).replace(tzinfo=timezone.utc)
+            )
+        ),
+        MAX_WORKERS,
+        {"account": MAX_WORKERS_PER_ACCOUNT},
+        window=4 * MAX_WORKERS
+    ):
+        collect(result)
+
+    if sink:
+        sink.close()
+    else:
+        # Results arrive with accounts interleaved; group the report by account.
+        position = {acc["account_id"]: index for index, acc in enumerate(ACCOUNTS)}
+        findings.sort(key=lambda pair: position.get(pair[1].account_id, len(position)))
+        write_report(findings, audits, checked_at)
+
+    log(20, {"event": "audit_complete", "counts": counts, "errors": len(errors)})
+    log(20, {"event": "retry_stats", **get_retry_stats()})
+    metrics.flush()
+
+    return {"findings": findings, "counts": counts, "errors": errors}
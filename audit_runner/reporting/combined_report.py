@@ -0,0 +1,50 @@
+import csv
+import io
+from datetime import datetime
+
+from core.csv_sink import CsvSink
+
+HEADER = [
+    "Audit",
+    "AccountId",
+    "Region",
+    "Resource",
+    "Issue",
+    "CheckedAt"
+]
+
+
+def _row(audit, f, checked_at):
+    return [
+        audit,
+        f.account_id,
+        f.region,
+        f.resource,
+        f.issue,
+        checked_at
+    ]
+
+
+def generate_csv(findings, checked_at=None):
+    """findings: (audit, Finding) pairs."""
+    checked_at = checked_at or datetime.utcnow().isoformat()
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(HEADER)
+
+    for audit, f in findings:
+        writer.writerow(_row(audit, f, checked_at))
+
+    return buffer.getvalue()
+
+
+class CombinedReportSink(CsvSink):
+    """Streaming form of generate_csv; see core.csv_sink.CsvSink."""
+
+    header = HEADER
+
+    def row(self, item):
+        audit, finding = item
+        return _row(audit, finding, self.checked_at)
@@ -0,0 +1,502 @@
+"""
+Offline AWS estate simulator for benchmarking the coworkers.
+
+Hooks botocore's before-parameter-build / before-call events (the same
+mechanism botocore.stub.Stubber uses) so real botocore clients serialize
+and dispatch every call, but responses come from a synthetic estate
+instead of the network. Per-call latency and throttling are injected in
+the hook, so the coworkers' retry, rate limiting and concurrency behave
+as they would against AWS.
+"""
+
+import base64
+import csv
+import gzip
+import hashlib
+import io
+import itertools
+import json
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote_plus
+
+from botocore.awsrequest import AWSResponse
+from botocore.response import StreamingBody
+
+THROTTLE_CODES = {
+    "s3": ("SlowDown", 503),
+    "s3-control": ("SlowDown", 503),
+    "rds": ("Throttling", 400),
+    "sts": ("Throttling", 400),
+}
+
+POLICY_TEMPLATES = [
+    {"Statement": [{"Effect": "Allow", "Principal": "*", "Action": "s3:GetObject", "Resource": "*"}]},
+    {"Statement": [{"Effect": "Allow", "Principal": {"AWS": "*"}, "Action": "s3:GetObject", "Resource": "*",
+                    "Condition": {"StringEquals": {"aws:PrincipalOrgID": "o-example"}}}]},
+    {"Statement": [{"Effect": "Deny", "Principal": "*", "Action": "s3:*", "Resource": "*",
+                    "Condition": {"Bool": {"aws:SecureTransport": "false"}}}]},
+    {"Statement": [{"Effect": "Allow", "Principal": {"AWS": "arn:aws:iam::111111111111:root"},
+                    "Action": "s3:*", "Resource": "*"}]},
+]
+
+PUBLIC_GRANT = {
+    "Grantee": {"Type": "Group", "URI": "http://acs.amazonaws.com/groups/global/AllUsers"},
+    "Permission": "READ",
+}
+
+
+# Bucket creation and snapshot dates count back from a fixed date rather than
+# the clock, so a seed gives the same estate on every run (and INCREMENTAL
+# state from one run matches the next).
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+# S3 Inventory reports of the simulated buckets (see Estate.objects).
+INVENTORY_CONFIG_ID = "daily"
+INVENTORY_DELIVERY = "2024-01-01T00-00Z"
+# Objects per inventory data file; larger inventories are split like real deliveries.
+INVENTORY_FILE_ROWS = 100000
+INVENTORY_FIELDS = ["Size", "IsLatest", "IsDeleteMarker", "EncryptionStatus", "ObjectOwner", "ObjectAccessControlList"]
+PUBLIC_OBJECT_ACL = base64.b64encode(json.dumps({"version": "2022-11-10", "status": "AVAILABLE", "grants": [
+    {"permission": "READ", "type": "Group", "uri": "http://acs.amazonaws.com/groups/global/AllUsers"}
+]}).encode()).decode()
+PRIVATE_OBJECT_ACL = base64.b64encode(json.dumps({"version": "2022-11-10", "status": "AVAILABLE", "grants": [
+    {"permission": "FULL_CONTROL", "type": "CanonicalUser", "canonicalId": "owner"}
+]}).encode()).decode()
+
+
+def inventory_bucket_for(account):
+    return f"bench-inventory-{account}"
+
+
+def account_id_for(index):
+    return f"{100000000000 + index:012d}"
+
+
+class Estate:
+    """Deterministic synthetic accounts, buckets, DB instances and snapshots."""
+
+    def __init__(self, accounts=1, buckets=100, regions=("us-east-1",), instances=50,
+                 snapshots=7, public_ratio=0.05, policy_ratio=0.3, no_pab_ratio=0.2, objects=0, seed=0):
+        rng = random.Random(seed)
+        self.seed = seed
+        self.public_ratio = public_ratio
+        # Objects per bucket; with objects > 0 every bucket has an S3 Inventory report.
+        self.objects = objects
+        self.accounts = [account_id_for(i) for i in range(accounts)]
+        self.owners = {account: hashlib.sha256(account.encode()).hexdigest() for account in self.accounts}
+        self.regions = list(regions)
+        self.buckets = {}
+        self.instances = {}
+        self.snapshots = {}
+        self.snapshots_by_instance = {}
+
+        for account in self.accounts:
+            names = sorted(f"bench-{account}-{i:06d}" for i in range(buckets))
+            self.buckets[account] = {
+                name: {
+                    "created": EPOCH - timedelta(days=rng.randint(1, 2000)),
+                    "public_acl": rng.random() < public_ratio,
+                    "pab": None if rng.random() < no_pab_ratio else {
+                        "BlockPublicAcls": True,
+                        "IgnorePublicAcls": True,
+                        "BlockPublicPolicy": rng.random() > public_ratio,
+                        "RestrictPublicBuckets": True,
+                    },
+                    "policy": json.dumps(rng.choice(POLICY_TEMPLATES)) if rng.random() < policy_ratio else None,
+                }
+                for name in names
+            }
+
+            for region in self.regions:
+                key = (account, region)
+                self.instances[key] = []
+                self.snapshots[key] = []
+                self.snapshots_by_instance[key] = {}
+                for i in range(instances):
+                    db_id = f"db-{i:06d}"
+                    self.instances[key].append({
+                        "DBInstanceIdentifier": db_id,
+                        "DBInstanceArn": f"arn:aws:rds:{region}:{account}:db:{db_id}",
+                        "BackupRetentionPeriod": 0 if rng.random() < public_ratio else 7,
+                    })
+                    own = self.snapshots_by_instance[key][db_id] = []
+                    for s in range(snapshots):
+                        own.append({
+                            "DBSnapshotIdentifier": f"rds:{db_id}-{s:04d}",
+                            "DBInstanceIdentifier": db_id,
+                            "SnapshotType": "automated",
+                            "SnapshotCreateTime": EPOCH - timedelta(days=rng.randint(0, 60)),
+                        })
+                    self.snapshots[key].extend(own)
+
+    def inventory_rows(self, account, bucket):
+        """S3 Inventory rows (Bucket, Key, *INVENTORY_FIELDS) of one bucket, generated on demand."""
+        rng = random.Random(f"{self.seed}:{bucket}")
+        for i in range(self.objects):
+            delete_marker = rng.random() < 0.01
+            yield [
+                bucket,
+                f"data/object {i:07d}.bin",
+                "" if delete_marker else str(rng.randint(0, 1 << 24)),
+                "false" if rng.random() < 0.02 else "true",
+                "true" if delete_marker else "false",
+                "NOT-SSE" if rng.random() < self.public_ratio else "SSE-S3",
+                "foreign-owner" if rng.random() < self.public_ratio / 5 else self.owners[account],
+                PUBLIC_OBJECT_ACL if rng.random() < self.public_ratio / 10 else PRIVATE_OBJECT_ACL,
+            ]
+
+    def rds_config_items(self):
+        """The RDS estate as AWS Config configuration items, one dict each."""
+        for (account, region), instances in self.instances.items():
+            for instance in instances:
+                yield {
+                    "resourceType": "AWS::RDS::DBInstance",
+                    "accountId": account,
+                    "awsRegion": region,
+                    "resourceId": instance["DBInstanceIdentifier"],
+                    "configuration": {
+                        "dBInstanceIdentifier": instance["DBInstanceIdentifier"],
+                        "dBInstanceArn": instance["DBInstanceArn"],
+                        "backupRetentionPeriod": instance["BackupRetentionPeriod"],
+                    },
+                }
+            for snap in self.snapshots[(account, region)]:
+                yield {
+                    "resourceType": "AWS::RDS::DBSnapshot",
+                    "accountId": account,
+                    "awsRegion": region,
+                    "resourceId": snap["DBSnapshotIdentifier"],
+                    "configuration": {
+                        "dBSnapshotIdentifier": snap["DBSnapshotIdentifier"],
+                        "dBInstanceIdentifier": snap["DBInstanceIdentifier"],
+                        "snapshotType": snap["SnapshotType"],
+                        "snapshotCreateTime": snap["SnapshotCreateTime"].isoformat(),
+                    },
+                }
+
+
+def _page(items, marker, limit, default_limit):
+    start = int(marker or 0)
+    limit = min(int(limit or default_limit), default_limit)
+    page = items[start:start + limit]
+    next_marker = str(start + limit) if start + limit < len(items) else None
+    return page, next_marker
+
+
+class AwsSimulator:
+    """
+    Install on boto3 or botocore sessions with attach(); collects call counts in
+    .calls and keeps uploaded objects in .objects.
+    """
+
+    def __init__(self, estate, latency_ms=0.0, jitter_ms=0.0, throttle_rate=0.0, inventory_format="CSV", seed=0):
+        self.estate = estate
+        self.inventory_format = inventory_format
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.throttle_rate = throttle_rate
+        self.rng = random.Random(seed)
+        self.calls = Counter()
+        self.throttled = Counter()
+        self.objects = {}
+        self.uploads = {}
+        self.lock = threading.Lock()
+
+    def attach(self, session):
+        # boto3 sessions expose .events; botocore sessions register directly.
+        register = session.events.register if hasattr(session, "events") else session.register
+        register("before-parameter-build", self._capture_params)
+        register("before-call", self._respond)
+
+    def _capture_params(self, params, context, **kwargs):
+        context["sim_params"] = dict(params)
+
+    def _respond(self, model, context, request_signer, **kwargs):
+        service = model.service_model.service_id.hyphenize()
+        operation = model.name
+        params = context.get("sim_params", {})
+
+        with self.lock:
+            self.calls[f"{service}.{operation}"] += 1
+            throttle = self.rng.random() < self.throttle_rate
+            delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+
+        if delay:
+            time.sleep(delay)
+
+        if throttle and service in THROTTLE_CODES:
+            with self.lock:
+                self.throttled[f"{service}.{operation}"] += 1
+            code, status = THROTTLE_CODES[service]
+            return self._error(code, status)
+
+        credentials = getattr(request_signer, "_credentials", None)
+        account = getattr(credentials, "access_key", "") or ""
+        account = account[len("SIM"):] if account.startswith("SIM") else None
+
+        handler = getattr(self, f"_{service.replace('-', '_')}_{operation}", None)
+        if handler is None:
+            return AWSResponse(None, 200, {}, None), {}
+        return handler(account, params, context)
+
+    def _ok(self, body):
+        body.setdefault("ResponseMetadata", {"HTTPStatusCode": 200})
+        return AWSResponse(None, 200, {}, None), body
+
+    def _error(self, code, status=400):
+        return AWSResponse(None, status, {}, None), {
+            "Error": {"Code": code, "Message": code},
+            "ResponseMetadata": {"HTTPStatusCode": status},
+        }
+
+    # STS
+
+    def _sts_AssumeRole(self, account, params, context):
+        role_account = params["RoleArn"].split(":")[4]
+        return self._ok({"Credentials": {
+            "AccessKeyId": f"SIM{role_account}",
+            "SecretAccessKey": "sim",
+            "SessionToken": "sim",
+            "Expiration": datetime.now(timezone.utc) + timedelta(hours=1),
+        }})
+
+    # S3
+
+    def _bucket(self, account, params):
+        return self.estate.buckets.get(account, {}).get(params.get("Bucket"))
+
+    def _s3_ListBuckets(self, account, params, context):
+        names = list(self.estate.buckets.get(account, {}))
+        if "MaxBuckets" not in params and "ContinuationToken" not in params:
+            page, token = names, None
+        else:
+            page, token = _page(names, params.get("ContinuationToken"), params.get("MaxBuckets"), 10000)
+        body = {"Buckets": [
+            {"Name": name, "CreationDate": self.estate.buckets[account][name]["created"]}
+            for name in page
+        ], "Owner": {}}
+        if token:
+            body["ContinuationToken"] = token
+        return self._ok(body)
+
+    def _s3_GetBucketAcl(self, account, params, context):
+        bucket = self._bucket(account, params)
+        if bucket is None:
+            return self._error("NoSuchBucket", 404)
+        return self._ok({
+            "Owner": {"ID": self.estate.owners[account]},
+            "Grants": [PUBLIC_GRANT] if bucket["public_acl"] else []
+        })
+
+    def _s3_GetPublicAccessBlock(self, account, params, context):
+        bucket = self._bucket(account, params)
+        if bucket is None or bucket["pab"] is None:
+            return self._error("NoSuchPublicAccessBlockConfiguration", 404)
+        return self._ok({"PublicAccessBlockConfiguration": dict(bucket["pab"])})
+
+    def _s3_GetBucketPolicy(self, account, params, context):
+        bucket = self._bucket(account, params)
+        if bucket is None or bucket["policy"] is None:
+            return self._error("NoSuchBucketPolicy", 404)
+        return self._ok({"Policy": bucket["policy"]})
+
+    def _s3_GetBucketEncryption(self, account, params, context):
+        return self._ok({"ServerSideEncryptionConfiguration": {"Rules": [
+            {"ApplyServerSideEncryptionByDefault": {"SSEAlgorithm": "AES256"}}
+        ]}})
+
+    def _s3_GetBucketVersioning(self, account, params, context):
+        return self._ok({"Status": "Enabled"})
+
+    def _s3_GetBucketLogging(self, account, params, context):
+        return self._ok({})
+
+    def _s3_ListBucketInventoryConfigurations(self, account, params, context):
+        if self._bucket(account, params) is None or not self.estate.objects:
+            return self._ok({"IsTruncated": False})
+        return self._ok({"IsTruncated": False, "InventoryConfigurationList": [{
+            "Id": INVENTORY_CONFIG_ID,
+            "IsEnabled": True,
+            "IncludedObjectVersions": "All",
+            "OptionalFields": INVENTORY_FIELDS,
+            "Schedule": {"Frequency": "Daily"},
+            "Destination": {"S3BucketDestination": {
+                "AccountId": account,
+                "Bucket": f"arn:aws:s3:::{inventory_bucket_for(account)}",
+                "Format": self.inventory_format,
+                "Prefix": "inventory",
+            }},
+        }]})
+
+    def _inventory_object(self, bucket, key):
+        """Manifest or data file of a simulated inventory delivery, built on demand."""
+        account = bucket[len("bench-inventory-"):]
+        parts = key.split("/")
+        if not bucket.startswith("bench-inventory-") or len(parts) != 5 or parts[0] != "inventory":
+            return None
+        source = parts[1]
+        if source not in self.estate.buckets.get(account, {}):
+            return None
+
+        base = f"inventory/{source}/{INVENTORY_CONFIG_ID}/"
+        extension = {"CSV": "csv.gz", "Parquet": "parquet"}[self.inventory_format]
+        if parts[3:] == [INVENTORY_DELIVERY, "manifest.json"]:
+            schema = ["Bucket", "Key"] + INVENTORY_FIELDS
+            if self.inventory_format == "Parquet":
+                schema = "message s3.inventory { " + " ".join(
+                    f"optional binary {name} (STRING);" for name in schema
+                ) + " }"
+            else:
+                schema = ", ".join(schema)
+            return json.dumps({
+                "sourceBucket": source,
+                "destinationBucket": f"arn:aws:s3:::{bucket}",
+                "fileFormat": self.inventory_format,
+                "fileSchema": schema,
+                "files": [
+                    {"key": f"{base}data/{source}-{number}.{extension}"}
+                    for number in range(max(1, -(-self.estate.objects // INVENTORY_FILE_ROWS)))
+                ],
+            }).encode()
+        name = parts[4] if parts[3] == "data" else ""
+        if not (name.startswith(source + "-") and name.endswith("." + extension)):
+            return None
+        number = name[len(source) + 1:-len(extension) - 1]
+        if not number.isdigit():
+            return None
+
+        start = int(number) * INVENTORY_FILE_ROWS
+        rows = itertools.islice(self.estate.inventory_rows(account, source), start, start + INVENTORY_FILE_ROWS)
+        if self.inventory_format == "Parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            names = ["bucket", "key", "size", "is_latest", "is_delete_marker",
+                     "encryption_status", "object_owner", "object_access_control_list"]
+            columns = list(zip(*rows)) or [()] * len(names)
+            table = pa.table({
+                "bucket": columns[0],
+                "key": columns[1],
+                "size": pa.array([int(v) if v else None for v in columns[2]], pa.int64()),
+                "is_latest": pa.array([v == "true" for v in columns[3]]),
+                "is_delete_marker": pa.array([v == "true" for v in columns[4]]),
+                **{name: columns[i] for i, name in enumerate(names) if i >= 5},
+            })
+            out = io.BytesIO()
+            pq.write_table(table, out, row_group_size=50000)
+            return out.getvalue()
+
+        text = io.StringIO()
+        writer = csv.writer(text, quoting=csv.QUOTE_ALL)
+        for row in rows:
+            # Inventory CSV reports URL-encode object keys.
+            row[1] = quote_plus(row[1], safe="/")
+            writer.writerow(row)
+        return gzip.compress(text.getvalue().encode())
+
+    def _s3_control_GetPublicAccessBlock(self, account, params, context):
+        return self._error("NoSuchPublicAccessBlockConfiguration", 404)
+
+    @staticmethod
+    def _read_body(body):
+        if hasattr(body, "read"):
+            body = body.read()
+        if isinstance(body, str):
+            body = body.encode()
+        return bytes(body or b"")
+
+    def _s3_PutObject(self, account, params, context):
+        with self.lock:
+            if params.get("IfNoneMatch") == "*" and (params["Bucket"], params["Key"]) in self.objects:
+                return self._error("PreconditionFailed", 412)
+            self.objects[(params["Bucket"], params["Key"])] = self._read_body(params.get("Body"))
+        return self._ok({"ETag": '"sim"'})
+
+    def _s3_GetObject(self, account, params, context):
+        data = self.objects.get((params["Bucket"], params["Key"]))
+        if data is None:
+            data = self._inventory_object(params["Bucket"], params["Key"])
+        if data is None:
+            return self._error("NoSuchKey", 404)
+        return self._ok({"Body": StreamingBody(io.BytesIO(data), len(data)), "ContentLength": len(data)})
+
+    def _s3_ListObjectsV2(self, account, params, context):
+        prefix = params.get("Prefix", "")
+        keys = sorted(k for b, k in self.objects if b == params["Bucket"] and k.startswith(prefix))
+        if params["Bucket"].startswith("bench-inventory-") and prefix.startswith("inventory/"):
+            # Each simulated bucket has one inventory delivery; only its manifest is listed.
+            source = prefix.split("/")[1]
+            manifest = f"inventory/{source}/{INVENTORY_CONFIG_ID}/{INVENTORY_DELIVERY}/manifest.json"
+            if self._inventory_object(params["Bucket"], manifest) is not None and manifest.startswith(prefix):
+                keys.append(manifest)
+        if params.get("Delimiter"):
+            delimiter = params["Delimiter"]
+            prefixes = sorted({
+                prefix + k[len(prefix):].split(delimiter, 1)[0] + delimiter
+                for k in keys if delimiter in k[len(prefix):]
+            })
+            keys = [k for k in keys if delimiter not in k[len(prefix):]]
+            return self._ok({
+                "Contents": [{"Key": k} for k in keys],
+                "CommonPrefixes": [{"Prefix": p} for p in prefixes],
+                "KeyCount": len(keys) + len(prefixes),
+                "IsTruncated": False,
+            })
+        return self._ok({"Contents": [{"Key": k} for k in keys], "KeyCount": len(keys), "IsTruncated": False})
+
+    def _s3_CreateMultipartUpload(self, account, params, context):
+        with self.lock:
+            upload_id = str(len(self.uploads) + 1)
+            self.uploads[upload_id] = {}
+        return self._ok({"UploadId": upload_id})
+
+    def _s3_UploadPart(self, account, params, context):
+        with self.lock:
+            self.uploads[params["UploadId"]][params["PartNumber"]] = self._read_body(params.get("Body"))
+        return self._ok({"ETag": f'"{params["PartNumber"]}"'})
+
+    def _s3_CompleteMultipartUpload(self, account, params, context):
+        with self.lock:
+            parts = self.uploads.pop(params["UploadId"])
+            self.objects[(params["Bucket"], params["Key"])] = b"".join(
+                parts[p["PartNumber"]] for p in params["MultipartUpload"]["Parts"]
+            )
+        return self._ok({})
+
+    def _s3_AbortMultipartUpload(self, account, params, context):
+        with self.lock:
+            self.uploads.pop(params["UploadId"], None)
+        return self._ok({})
+
+    # RDS
+
+    def _rds_key(self, account, context):
+        return (account, context.get("client_region"))
+
+    def _rds_DescribeDBInstances(self, account, params, context):
+        instances = self.estate.instances.get(self._rds_key(account, context), [])
+        if params.get("DBInstanceIdentifier"):
+            instances = [i for i in instances if i["DBInstanceIdentifier"] == params["DBInstanceIdentifier"]]
+        page, marker = _page(instances, params.get("Marker"), params.get("MaxRecords"), 100)
+        body = {"DBInstances": page}
+        if marker:
+            body["Marker"] = marker
+        return self._ok(body)
+
+    def _rds_DescribeDBSnapshots(self, account, params, context):
+        key = self._rds_key(account, context)
+        if params.get("DBInstanceIdentifier"):
+            snapshots = self.estate.snapshots_by_instance.get(key, {}).get(params["DBInstanceIdentifier"], [])
+        else:
+            snapshots = self.estate.snapshots.get(key, [])
+        if params.get("SnapshotType"):
+            snapshots = [s for s in snapshots if s["SnapshotType"] == params["SnapshotType"]]
+        page, marker = _page(snapshots, params.get("Marker"), params.get("MaxRecords"), 100)
+        body = {"DBSnapshots": page}
+        if marker:
+            body["Marker"] = marker
+        return self._ok(body)
@@ -0,0 +1,224 @@
+"""
+Run one coworker audit against a simulated AWS estate, fully offline.
+
+    python benchmarks/run_benchmark.py s3 --accounts 2 --buckets 5000 --latency-ms 20
+    python benchmarks/run_benchmark.py s3 --buckets 10000 --set SCAN_MODE=concurrent --throttle-rate 0.01
+    python benchmarks/run_benchmark.py rds --regions us-east-1,eu-west-1 --instances 2500 --snapshots 14
+    python benchmarks/run_benchmark.py rds --instances 20000 --inventory file
+    python benchmarks/run_benchmark.py s3 --buckets 200 --objects 20000 --inventory-format Parquet
+    python benchmarks/run_benchmark.py combined --accounts 4 --buckets 500 --instances 200
+    python benchmarks/run_benchmark.py s3 --buckets 4000 --lambda-budget-ms 500 --set REPORT_STREAMING=true
+
+Prints one JSON document with wall time, API calls per operation,
+retries/throttles seen by core.retry, findings and peak memory.
+Each invocation runs a single audit so module-level caches start cold;
+run it several times (or from a shell loop) to compare configurations.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+TARGETS = {
+    "s3": os.path.join(ROOT, "S3_compliance_coworker"),
+    "rds": os.path.join(ROOT, "rds_digital_coworker"),
+    "combined": os.path.join(ROOT, "audit_runner"),
+}
+
+sys.path.insert(0, HERE)
+
+from aws_sim import EPOCH, AwsSimulator, Estate  # noqa: E402
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("target", choices=sorted(TARGETS))
+    parser.add_argument("--accounts", type=int, default=1)
+    parser.add_argument("--buckets", type=int, default=1000, help="buckets per account (s3)")
+    parser.add_argument("--objects", type=int, default=0,
+                        help="s3: objects per bucket, listed in an S3 Inventory report; enables OBJECT_AUDIT")
+    parser.add_argument("--inventory-format", choices=["CSV", "Parquet"], default="CSV",
+                        help="s3: format of the simulated S3 Inventory reports (Parquet needs pyarrow)")
+    parser.add_argument("--regions", default="us-east-1", help="comma-separated regions (rds)")
+    parser.add_argument("--instances", type=int, default=500, help="DB instances per account and region (rds)")
+    parser.add_argument("--snapshots", type=int, default=7, help="automated snapshots per instance (rds)")
+    parser.add_argument("--public-ratio", type=float, default=0.05)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="mean simulated latency per API call")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="probability a call is throttled")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--inventory", choices=["file", "s3"],
+                        help="rds: audit a gzipped JSON-lines AWS Config export of the estate "
+                             "(local file or simulated S3 object) instead of the live APIs")
+    parser.add_argument("--lambda-budget-ms", type=int,
+                        help="s3/rds: run as time-sliced invocations with a fake Lambda context of this "
+                             "budget, resuming from each checkpoint until the audit completes")
+    parser.add_argument("--trace-memory", action="store_true", help="also report tracemalloc peak (slower)")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra environment for the coworker config, e.g. SCAN_MODE=concurrent")
+    args = parser.parse_args(argv)
+    if args.lambda_budget_ms and args.target == "combined":
+        parser.error("--lambda-budget-ms applies to s3 and rds only")
+    return args
+
+
+class FakeContext:
+    """The part of the Lambda context the coworkers read: the time left."""
+
+    invoked_function_arn = "arn:aws:lambda:us-east-1:000000000000:function:benchmark"
+
+    def __init__(self, budget_ms):
+        self.ends = time.monotonic() + budget_ms / 1000
+
+    def get_remaining_time_in_millis(self):
+        return int((self.ends - time.monotonic()) * 1000)
+
+
+def run_sliced(coworker, budget_ms):
+    """(result of the final slice, number of slices)."""
+    token, slices = None, 0
+    while True:
+        slices += 1
+        result = coworker.run(context=FakeContext(budget_ms), continuation_token=token)
+        if not (isinstance(result, dict) and result.get("status") == "incomplete"):
+            return result, slices
+        token = result["continuation_token"]
+
+
+def configure_environment(args, estate):
+    regions = estate.regions
+    accounts = [
+        {
+            "account_id": account,
+            "role_arn": f"arn:aws:iam::{account}:role/SecurityAuditRole",
+            "regions": regions,
+        }
+        for account in estate.accounts
+    ]
+
+    os.environ.update({
+        "ACCOUNTS_JSON": json.dumps(accounts),
+        "REPORT_BUCKET": "bench-reports",
+        "AWS_ACCESS_KEY_ID": "SIMBASE",
+        "AWS_SECRET_ACCESS_KEY": "sim",
+        "AWS_DEFAULT_REGION": "us-east-1",
+        # Keep stdout to the benchmark report; override with --set METRICS_MODE=json.
+        "METRICS_MODE": "off",
+        # The estate is dated from EPOCH, so snapshot ages are measured there.
+        "AUDIT_AS_OF": EPOCH.isoformat(),
+    })
+    os.environ.pop("AWS_PROFILE", None)
+
+    for item in args.set:
+        key, _, value = item.partition("=")
+        os.environ[key] = value
+
+
+def write_inventory(args, estate, sim):
+    data = gzip.compress("".join(json.dumps(item) + "\n" for item in estate.rds_config_items()).encode())
+    if args.inventory == "s3":
+        sim.objects[("bench-inventory", "rds/config.jsonl.gz")] = data
+        return "s3://bench-inventory/rds/config.jsonl.gz"
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-inventory-"), "config.jsonl.gz")
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    estate = Estate(
+        accounts=args.accounts,
+        buckets=args.buckets if args.target in ("s3", "combined") else 0,
+        regions=[r.strip() for r in args.regions.split(",") if r.strip()],
+        instances=args.instances if args.target in ("rds", "combined") else 0,
+        snapshots=args.snapshots,
+        public_ratio=args.public_ratio,
+        objects=args.objects,
+        seed=args.seed,
+    )
+    sim = AwsSimulator(
+        estate,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        throttle_rate=args.throttle_rate,
+        inventory_format=args.inventory_format,
+        seed=args.seed,
+    )
+    configure_environment(args, estate)
+    if args.objects:
+        os.environ.setdefault("OBJECT_AUDIT", "true")
+    if args.inventory:
+        os.environ["RESOURCE_SOURCE"] = "inventory"
+        os.environ["INVENTORY_LOCATIONS"] = write_inventory(args, estate, sim)
+
+    sys.path.insert(0, TARGETS[args.target])
+    os.chdir(TARGETS[args.target])
+
+    import core.aws_session
+    sim.attach(core.aws_session.get_session())
+
+    import core.retry
+    import main as coworker
+
+    if args.trace_memory:
+        tracemalloc.start()
+
+    started = time.perf_counter()
+    slices = None
+    if args.lambda_budget_ms:
+        result, slices = run_sliced(coworker, args.lambda_budget_ms)
+    else:
+        result = coworker.run()
+    wall = time.perf_counter() - started
+
+    traced_peak = tracemalloc.get_traced_memory()[1] if args.trace_memory else None
+    retry_stats = core.retry.get_retry_stats()
+
+    report = {
+        "target": args.target,
+        "scale": {
+            "accounts": args.accounts,
+            "buckets_per_account": args.buckets if args.target != "rds" else None,
+            "objects_per_bucket": args.objects or None,
+            "regions": estate.regions if args.target != "s3" else None,
+            "instances_per_region": args.instances if args.target != "s3" else None,
+            "snapshots_per_instance": args.snapshots if args.target != "s3" else None,
+        },
+        "latency_ms": args.latency_ms,
+        "throttle_rate": args.throttle_rate,
+        "settings": args.set,
+        "slices": slices,
+        "wall_seconds": round(wall, 3),
+        "api_calls": sum(sim.calls.values()),
+        "api_calls_by_operation": dict(sorted(sim.calls.items())),
+        "throttled_by_simulator": sum(sim.throttled.values()),
+        "retries": retry_stats["retries"],
+        "throttles": retry_stats["throttles"],
+        "findings": (
+            sum(result["counts"].values()) if isinstance(result, dict) and "counts" in result
+            else len(result["findings"] if isinstance(result, dict) else result)
+        ),
+        "findings_by_audit": result.get("counts") if isinstance(result, dict) else None,
+        "errors": len(result["errors"]) if isinstance(result, dict) else None,
+        # ru_maxrss is KiB on Linux.
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "traced_peak_mb": round(traced_peak / 2 ** 20, 1) if traced_peak is not None else None,
+    }
+
+    print(json.dumps(report, indent=2, default=str))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Cold-start benchmark for the coworker Lambda handlers, fully offline.
+
+    python benchmarks/startup_benchmark.py
+    python benchmarks/startup_benchmark.py s3 --runs 10
+
+Each run starts a fresh interpreter (a cold container), then times:
+
+- import_ms: importing handler.py (config, main and everything they pull in)
+- first_invocation_ms: the first lambda_handler call, including botocore
+  session and client creation, against a tiny simulated estate
+- warm_invocation_ms: a second call in the same process, reusing the
+  container's session, credentials and clients
+
+Prints the median of each per target as JSON.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+TARGETS = {
+    "s3": os.path.join(ROOT, "S3_compliance_coworker"),
+    "rds": os.path.join(ROOT, "rds_digital_coworker"),
+}
+
+
+def child(target):
+    """One cold start in this process; prints its timings as JSON."""
+    sys.path.insert(0, HERE)
+    from aws_sim import AwsSimulator, Estate
+
+    estate = Estate(accounts=1, buckets=20, regions=["us-east-1"], instances=20, snapshots=3)
+    sim = AwsSimulator(estate)
+    os.environ.update({
+        "ACCOUNTS_JSON": json.dumps([{
+            "account_id": account,
+            "role_arn": f"arn:aws:iam::{account}:role/SecurityAuditRole",
+            "regions": estate.regions,
+        } for account in estate.accounts]),
+        "REPORT_BUCKET": "bench-reports",
+        "AWS_ACCESS_KEY_ID": "SIMBASE",
+        "AWS_SECRET_ACCESS_KEY": "sim",
+        "AWS_DEFAULT_REGION": "us-east-1",
+        "METRICS_MODE": "off",
+    })
+    os.environ.pop("AWS_PROFILE", None)
+    sys.path.insert(0, TARGETS[target])
+    os.chdir(TARGETS[target])
+
+    started = time.perf_counter()
+    import handler
+    import_ms = (time.perf_counter() - started) * 1000
+
+    # Attach the simulator when the coworker creates its session, so session
+    # creation stays inside the first invocation's timing.
+    import core.aws_session
+    get_session = core.aws_session.get_session
+    attached = []
+
+    def simulated_session():
+        session = get_session()
+        if not attached:
+            sim.attach(session)
+            attached.append(session)
+        return session
+
+    core.aws_session.get_session = simulated_session
+
+    started = time.perf_counter()
+    handler.lambda_handler({}, None)
+    first_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    handler.lambda_handler({}, None)
+    warm_ms = (time.perf_counter() - started) * 1000
+
+    print(json.dumps({
+        "import_ms": import_ms,
+        "first_invocation_ms": first_ms,
+        "warm_invocation_ms": warm_ms,
+        "boto3_imported": "boto3" in sys.modules,
+        "modules_loaded": len(sys.modules),
+    }))
+
+
+def measure(target, runs):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", target],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    return {
+        "target": target,
+        "runs": runs,
+        **{
+            key: round(statistics.median(sample[key] for sample in samples), 1)
+            for key in ("import_ms", "first_invocation_ms", "warm_invocation_ms")
+        },
+        "cold_start_ms": round(statistics.median(
+            sample["import_ms"] + sample["first_invocation_ms"] for sample in samples
+        ), 1),
+        "boto3_imported": samples[-1]["boto3_imported"],
+        "modules_loaded": samples[-1]["modules_loaded"],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("targets", nargs="*", metavar="{rds,s3}", help="default: both")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", choices=sorted(TARGETS), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child(args.child)
+        return None
+
+    unknown = set(args.targets) - set(TARGETS)
+    if unknown:
+        parser.error(f"unknown target(s): {', '.join(sorted(unknown))}")
+
+    report = [measure(target, args.runs) for target in args.targets or sorted(TARGETS)]
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+from core.retry import aws_retry
+
+# Role session name shown in the audited accounts' CloudTrail. Credentials are
+# cached per role, so every audit in a process shares one assumed session.
+SESSION_NAME = "ComplianceAudit"
+
+# Refresh assumed-role credentials this long before they expire.
+REFRESH_MARGIN = timedelta(minutes=10)
+
+# One pool per client, sized for the concurrent scan; botocore's own retries
+# are off because core.retry.aws_retry owns backoff and rate limiting, so
+# every call made with these clients must go through it.
+CLIENT_CONFIG = {
+    "max_pool_connections": 50,
+    "retries": {"mode": "standard", "max_attempts": 1}
+}
+
+# Module-level state survives warm Lambda invocations.
+_session = {}
+_credentials = {}
+_clients = {}
+_role_locks = {}
+_lock = threading.Lock()
+
+
+def get_session():
+    """
+    The container's botocore session and client config, created on first
+    use so importing the handler stays cheap. Clients come straight from
+    botocore: boto3 adds nothing the coworkers use but its import
+    (s3transfer and friends) is a large share of cold-start time.
+    """
+    with _lock:
+        if "current" not in _session:
+            import botocore.session
+            from botocore.config import Config
+
+            _session["config"] = Config(**CLIENT_CONFIG)
+            _session["current"] = botocore.session.get_session()
+        return _session["current"]
+
+
+def _role_lock(role_arn):
+    with _lock:
+        return _role_locks.setdefault(role_arn, threading.Lock())
+
+
+def _fresh(creds):
+    return creds["Expiration"] - REFRESH_MARGIN > datetime.now(timezone.utc)
+
+
+def get_credentials(role_arn, session_name=SESSION_NAME):
+    creds = _credentials.get(role_arn)
+    if creds and _fresh(creds):
+        return creds
+
+    with _role_lock(role_arn):
+        creds = _credentials.get(role_arn)
+        if creds and _fresh(creds):
+            return creds
+
+        sts = get_base_client("sts")
+        # Keyed by the account the role is in, so accounts do not throttle each other.
+        creds = aws_retry(lambda: sts.assume_role(
+            RoleArn=role_arn,
+            RoleSessionName=session_name
+        )["Credentials"], limiter_key=(role_arn.split(":")[4], "sts", "AssumeRole"))
+        _credentials[role_arn] = creds
+        return creds
+
+
+def get_base_client(service, region=None):
+    """Client using the Lambda's own credentials, cached per (service, region)."""
+    key = (None, service, region)
+    session = get_session()
+    with _lock:
+        entry = _clients.get(key)
+        if entry is None:
+            entry = _clients[key] = (
+                session.create_client(service, region_name=region, config=_session["config"]),
+                None
+            )
+        return entry[0]
+
+
+def get_client(role_arn, service, region=None, session_name=SESSION_NAME):
+    """
+    Client for service/region under role_arn. Built once per
+    (role, service, region) and rebuilt only when the role's credentials
+    have been refreshed.
+    """
+    creds = get_credentials(role_arn, session_name)
+    key = (role_arn, service, region)
+    session = get_session()
+
+    with _lock:
+        entry = _clients.get(key)
+        if entry is None or entry[1] is not creds:
+            entry = _clients[key] = (
+                session.create_client(
+                    service,
+                    region_name=region,
+                    config=_session["config"],
+                    aws_access_key_id=creds["AccessKeyId"],
+                    aws_secret_access_key=creds["SecretAccessKey"],
+                    aws_session_token=creds["SessionToken"]
+                ),
+                creds
+            )
+        return entry[0]
+
+
+def clear_cache():
+    with _lock:
+        _credentials.clear()
+        _clients.clear()
+
+
+def assume_s3_client(role_arn):
+    return get_client(role_arn, "s3")
+
+
+def assume_rds_client(role_arn, region):
+    return get_client(role_arn, "rds", region)
@@ -0,0 +1,52 @@
+import json
+
+from core.aws_session import get_base_client
+from core.retry import aws_retry
+
+
+class OutOfTime(Exception):
+    """
+    Raised by a scan that stopped early because its Deadline passed.
+    Carries the findings gathered so far and a cursor to resume from.
+    """
+
+    def __init__(self, findings, cursor):
+        super().__init__("time budget exhausted")
+        self.findings = findings
+        self.cursor = cursor
+
+
+class Deadline:
+    """
+    Time budget of one Lambda invocation. expired() turns true once less
+    than reserve_ms remains, leaving time to finish in-flight work and
+    save a checkpoint. Without a context (local runs) it never expires.
+
+    The reserve is capped at a quarter of the time remaining when the
+    Deadline is created, so a reserve as long as the function timeout
+    (60 s on a 60 s Lambda) still leaves most of each slice for work.
+    """
+
+    def __init__(self, context=None, reserve_ms=60000):
+        self.context = context
+        remaining = self.remaining_ms()
+        self.reserve_ms = reserve_ms if remaining is None else min(reserve_ms, remaining // 4)
+
+    def remaining_ms(self):
+        if self.context is None:
+            return None
+        return self.context.get_remaining_time_in_millis()
+
+    def expired(self):
+        remaining = self.remaining_ms()
+        return remaining is not None and remaining < self.reserve_ms
+
+
+def continue_async(context, continuation_token):
+    """Invoke this same Lambda asynchronously to pick up continuation_token."""
+    client = get_base_client("lambda")
+    aws_retry(lambda: client.invoke(
+        FunctionName=context.invoked_function_arn,
+        InvocationType="Event",
+        Payload=json.dumps({"continuation_token": continuation_token}).encode()
+    ), limiter_key=("self", "lambda", "Invoke"))
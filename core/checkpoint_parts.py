@@ -0,0 +1,112 @@
+"""
+Findings of a time-sliced run whose report is streamed, kept out of
+memory: each slice writes the findings it produces to its own gzipped
+JSON-lines part as they are produced,
+
+    {prefix}/part-00001.jsonl.gz, {prefix}/part-00002.jsonl.gz, ...
+
+and the checkpoint only records how many parts there are and the
+per-code counts. The slice that completes the audit streams every part
+into the report sink, one line at a time, so the report is written once.
+"""
+
+import gzip
+import io
+import json
+import os
+import zlib
+
+from core.aws_session import get_base_client
+from core.findings import Finding
+from core.retry import aws_retry
+from core.s3_upload import MultipartUpload
+from core.state_store import delete_state
+
+
+def part_location(prefix, number):
+    return f"{prefix}/part-{number:05d}.jsonl.gz"
+
+
+class _LocalUpload:
+    """MultipartUpload's write/complete/abort for a local file."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.file = open(path + ".tmp", "wb")
+
+    def write(self, data):
+        self.file.write(data)
+
+    def complete(self):
+        self.file.close()
+        os.replace(self.path + ".tmp", self.path)
+
+    def abort(self):
+        self.file.close()
+        os.remove(self.path + ".tmp")
+
+
+class FindingsPart:
+    """
+    Streams findings as gzipped JSON lines to an s3:// URI or a local path.
+    Memory is bounded by flush_bytes plus one upload part.
+    """
+
+    def __init__(self, location, flush_bytes=256 * 1024):
+        if location.startswith("s3://"):
+            bucket, _, key = location[len("s3://"):].partition("/")
+            self.upload = MultipartUpload(bucket, key, content_type="application/gzip")
+        else:
+            self.upload = _LocalUpload(location)
+        self.compressor = zlib.compressobj(wbits=31)
+        self.buffer = io.StringIO()
+        self.flush_bytes = flush_bytes
+
+    def extend(self, findings):
+        for f in findings:
+            self.buffer.write(json.dumps(f.to_dict(), separators=(",", ":")) + "\n")
+        if self.buffer.tell() >= self.flush_bytes:
+            self._flush()
+
+    def _flush(self):
+        data = self.compressor.compress(self.buffer.getvalue().encode())
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        if data:
+            self.upload.write(data)
+
+    def close(self):
+        self._flush()
+        self.upload.write(self.compressor.flush())
+        self.upload.complete()
+
+    def abort(self):
+        self.upload.abort()
+
+
+def iter_part(location):
+    """Findings of one part, read line by line."""
+    if location.startswith("s3://"):
+        bucket, _, key = location[len("s3://"):].partition("/")
+        raw = aws_retry(
+            lambda: get_base_client("s3").get_object(Bucket=bucket, Key=key)["Body"],
+            limiter_key=("state", "s3", "GetObject")
+        )
+    else:
+        raw = open(location, "rb")
+    with raw, io.TextIOWrapper(gzip.GzipFile(fileobj=raw), encoding="utf-8") as lines:
+        for line in lines:
+            yield Finding.from_dict(json.loads(line))
+
+
+def iter_parts(prefix, count):
+    for number in range(1, count + 1):
+        yield from iter_part(part_location(prefix, number))
+
+
+def delete_parts(prefix, count):
+    for number in range(1, count + 1):
+        delete_state(part_location(prefix, number))
+    if not prefix.startswith("s3://") and os.path.isdir(prefix) and not os.listdir(prefix):
+        os.rmdir(prefix)
@@ -0,0 +1,123 @@
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+def iter_bounded(tasks, max_workers, max_per_key, stop=None, window=None):
+    """
+    Run (key, fn) tasks on one shared pool and yield their results in task
+    order. At most max_workers tasks are in flight overall and at most
+    max_per_key for any single key (e.g. account id).
+
+    max_per_key may instead be a dict of caps by kind; each task key is
+    then a tuple of (kind, value) slots, e.g.
+    (("account", "111111111111"), ("region", "us-east-1")), and a task
+    only starts while every one of its slots is under its kind's cap.
+
+    tasks may be any iterable and is consumed lazily. With window set, at
+    most that many tasks are taken from it ahead of the results yielded so
+    far, so a slow consumer holds back the producer (a generator listing
+    resources page by page, say) and memory stays bounded by the window.
+
+    Once stop() returns true no further tasks are started; tasks already
+    running finish, and only the finished prefix of results is yielded.
+    """
+    tasks = iter(tasks)
+    exhausted = stopped = False
+    taken = 0
+    next_result = 0
+    finished = {}
+
+    def slots(key):
+        if isinstance(max_per_key, dict):
+            return [(slot, max_per_key[slot[0]]) for slot in key]
+        return [(key, max_per_key)]
+
+    pending = {}
+    key_slots = {}
+    in_flight = {}
+    per_slot = defaultdict(int)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while True:
+            if not stopped and stop and stop():
+                stopped = exhausted = True
+                pending.clear()
+
+            while not exhausted and (window is None or taken - next_result < window):
+                try:
+                    key, fn = next(tasks)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.setdefault(key, deque()).append((taken, fn))
+                if key not in key_slots:
+                    key_slots[key] = slots(key)
+                taken += 1
+
+            for key in list(pending):
+                queue = pending[key]
+                while (
+                    queue
+                    and len(in_flight) < max_workers
+                    and all(per_slot[slot] < cap for slot, cap in key_slots[key])
+                ):
+                    index, fn = queue.popleft()
+                    in_flight[pool.submit(fn)] = (index, key)
+                    for slot, _ in key_slots[key]:
+                        per_slot[slot] += 1
+                if not queue:
+                    del pending[key]
+
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, key = in_flight.pop(future)
+                for slot, _ in key_slots[key]:
+                    per_slot[slot] -= 1
+                finished[index] = future.result()
+
+            while next_result in finished:
+                yield finished.pop(next_result)
+                next_result += 1
+
+
+def interleave(iterables, width):
+    """
+    Round-robin over at most width of iterables at a time, starting the
+    next one as each runs out. Mixes several keys (accounts) into one
+    lazily consumed task stream, so a per-key cap does not serialize it.
+    """
+    iterables = iter(iterables)
+    active = deque()
+    while True:
+        while len(active) < width:
+            iterable = next(iterables, None)
+            if iterable is None:
+                break
+            active.append(iter(iterable))
+        if not active:
+            return
+
+        iterator = active.popleft()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            continue
+        yield item
+        active.append(iterator)
+
+
+def run_bounded(tasks, max_workers, max_per_key, on_result=None, stop=None):
+    """
+    iter_bounded collected into a list. on_result, if given, is called
+    with each result in task order as soon as every earlier task has
+    finished. When stopped early, only the finished prefix is returned.
+    """
+    results = []
+    for result in iter_bounded(tasks, max_workers, max_per_key, stop=stop):
+        if on_result:
+            on_result(result)
+        results.append(result)
+    return results
@@ -0,0 +1,59 @@
+import csv
+import io
+import zlib
+from datetime import datetime
+
+
+class CsvSink:
+    """
+    Streams report rows as CSV into an upload (anything with write(bytes),
+    complete() and abort(), e.g. core.s3_upload.MultipartUpload),
+    optionally gzip-compressed. Memory is bounded by flush_bytes plus
+    one upload part regardless of the number of rows.
+
+    Subclasses set header and implement row(item) for their report schema.
+    """
+
+    header = []
+
+    def __init__(self, upload, compress=False, checked_at=None, flush_bytes=256 * 1024):
+        self.upload = upload
+        self.checked_at = checked_at or datetime.utcnow().isoformat()
+        self.flush_bytes = flush_bytes
+        self.compressor = zlib.compressobj(wbits=31) if compress else None
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+        self.rows = 0
+
+        self.writer.writerow(self.header)
+
+    def row(self, item):
+        raise NotImplementedError
+
+    def add(self, item):
+        self.writer.writerow(self.row(item))
+        self.rows += 1
+        if self.buffer.tell() >= self.flush_bytes:
+            self._flush()
+
+    def extend(self, items):
+        for item in items:
+            self.add(item)
+
+    def _flush(self):
+        data = self.buffer.getvalue().encode()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        if self.compressor:
+            data = self.compressor.compress(data)
+        if data:
+            self.upload.write(data)
+
+    def close(self):
+        self._flush()
+        if self.compressor:
+            self.upload.write(self.compressor.flush())
+        self.upload.complete()
+
+    def abort(self):
+        self.upload.abort()
@@ -0,0 +1,113 @@
+import sys
+from collections import Counter
+from functools import lru_cache
+
+# Issue code -> report message template. Findings keep the code and its
+# parameters; the message is only formatted when a report row is written.
+ISSUES = {}
+
+
+def register_issue(code, message):
+    ISSUES[code] = message
+    return code
+
+
+@lru_cache(maxsize=4096)
+def format_issue(code, params=()):
+    template = ISSUES.get(code, code)
+    return template.format(**dict(params)) if params else template
+
+
+class Finding:
+    """
+    One issue on one resource (bucket, DB instance, ...). Repeated strings
+    are interned, so millions of findings share one copy of each account
+    id, region and issue code.
+    """
+
+    __slots__ = ("account_id", "region", "resource", "code", "params")
+
+    def __init__(self, account_id, resource, code, region="", params=()):
+        self.account_id = sys.intern(account_id)
+        self.region = sys.intern(region)
+        self.resource = sys.intern(resource)
+        self.code = sys.intern(code)
+        self.params = tuple(sorted(params.items())) if isinstance(params, dict) else tuple(params)
+
+    @property
+    def issue(self):
+        return format_issue(self.code, self.params)
+
+    def to_dict(self, resource_key="resource"):
+        data = {"account_id": self.account_id}
+        if self.region:
+            data["region"] = self.region
+        data[resource_key] = self.resource
+        data["code"] = self.code
+        if self.params:
+            data["params"] = dict(self.params)
+        data["issue"] = self.issue
+        return data
+
+    @classmethod
+    def from_dict(cls, data, resource_key="resource"):
+        return cls(
+            data["account_id"],
+            data[resource_key],
+            data["code"],
+            data.get("region", ""),
+            data.get("params", ())
+        )
+
+
+class FindingsStore:
+    """
+    Findings of one run, in scan order. Report writers iterate it directly.
+
+    With retain=False only the per-code counts are kept: the findings have
+    already gone to a streaming report sink, so memory stays flat however
+    many there are, and iterating the store yields nothing.
+    """
+
+    def __init__(self, findings=(), retain=True):
+        self.retain = retain
+        self._findings = []
+        self._counts = Counter()
+        self.extend(findings)
+
+    @classmethod
+    def from_counts(cls, counts):
+        """A counts-only store holding counts saved from another, e.g. in a checkpoint."""
+        store = cls(retain=False)
+        store._counts.update(counts)
+        return store
+
+    def add(self, account_id, resource, code, region="", **params):
+        finding = Finding(account_id, resource, code, region, params)
+        self.extend((finding,))
+        return finding
+
+    def extend(self, findings):
+        if isinstance(findings, FindingsStore) and not findings.retain:
+            # Nothing to iterate; carry over its counts.
+            if self.retain:
+                raise ValueError("cannot extend a retaining store with a counts-only one")
+            self._counts.update(findings._counts)
+            return
+        if self.retain:
+            findings = list(findings)
+            self._findings.extend(findings)
+        self._counts.update(f.code for f in findings)
+
+    def __len__(self):
+        return sum(self._counts.values())
+
+    def __iter__(self):
+        return iter(self._findings)
+
+    def counts(self):
+        """Number of findings per issue code."""
+        return dict(self._counts)
+
+    def to_dicts(self, resource_key="resource"):
+        return [f.to_dict(resource_key) for f in self._findings]
@@ -0,0 +1,257 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+
+# Latency histogram bucket upper bounds in milliseconds.
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, float("inf"))
+
+# Slowest keys (accounts, regions, ...) reported per span kind.
+TOP_N = 10
+
+_run = {"correlation_id": str(uuid.uuid4())}
+
+
+def get_logger():
+    logger = logging.getLogger()
+    logger.setLevel(logging.INFO)
+
+    def log(level, payload):
+        if not logger.isEnabledFor(level):
+            return
+        payload["correlation_id"] = _run["correlation_id"]
+        logger.log(level, json.dumps(payload, default=str))
+
+    return log
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def add(self, ms):
+        for index, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.total += ms
+        self.min = min(self.min, ms)
+        self.max = max(self.max, ms)
+
+    def emf(self):
+        # EMF histogram form: representative value per non-empty bucket + its count.
+        values, counts = [], []
+        previous = 0.0
+        for bound, count in zip(BUCKETS_MS, self.counts):
+            if count:
+                values.append(self.max if bound == float("inf") else (previous + bound) / 2)
+                counts.append(count)
+            previous = bound
+        return {
+            "Values": values,
+            "Counts": counts,
+            "Min": self.min if self.count else 0,
+            "Max": self.max,
+            "Sum": self.total,
+            "Count": self.count
+        }
+
+
+class NullMetrics:
+    """Disabled instrumentation: every hook is a no-op."""
+
+    enabled = False
+
+    def span(self, kind, key=None):
+        return nullcontext()
+
+    def add_span(self, kind, ms, key=None):
+        pass
+
+    def observe_api(self, api, started, error=False):
+        pass
+
+    def count_api(self, api, field):
+        pass
+
+    def flush(self):
+        return None
+
+
+class Metrics:
+    """
+    Per-run timing spans (account, region, bucket, ...), per-API latency
+    histograms and call/error/retry/throttle counters. flush() writes them
+    as CloudWatch Embedded Metric Format lines ("emf") or a JSON file ("json").
+    """
+
+    enabled = True
+
+    def __init__(self, mode, namespace, service, path=None):
+        self.mode = mode
+        self.namespace = namespace
+        self.service = service
+        self.path = path
+        self.started = time.time()
+        self.apis = {}
+        self.spans = {}
+        self.span_totals = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(self, kind, key=None):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(kind, (time.perf_counter() - started) * 1000, key)
+
+    def add_span(self, kind, ms, key=None):
+        """Record a span timed by the caller, e.g. one that is not a single block."""
+        with self.lock:
+            self.spans.setdefault(kind, Histogram()).add(ms)
+            if key is not None:
+                totals = self.span_totals.setdefault(kind, {})
+                totals[key] = totals.get(key, 0.0) + ms
+
+    def _api(self, api):
+        entry = self.apis.get(api)
+        if entry is None:
+            entry = self.apis[api] = {
+                "latency": Histogram(),
+                "calls": 0,
+                "errors": 0,
+                "retries": 0,
+                "throttles": 0,
+                "fatal": 0
+            }
+        return entry
+
+    def observe_api(self, api, started, error=False):
+        ms = (time.perf_counter() - started) * 1000
+        with self.lock:
+            entry = self._api(api)
+            entry["latency"].add(ms)
+            if error:
+                entry["errors"] += 1
+
+    def count_api(self, api, field):
+        with self.lock:
+            self._api(api)[field] += 1
+
+    def summary(self):
+        with self.lock:
+            return {
+                "correlation_id": _run["correlation_id"],
+                "duration_ms": round((time.time() - self.started) * 1000, 1),
+                "apis": {
+                    api: {
+                        "calls": entry["calls"],
+                        "errors": entry["errors"],
+                        "retries": entry["retries"],
+                        "throttles": entry["throttles"],
+                        "latency_ms": entry["latency"].emf()
+                    }
+                    for api, entry in self.apis.items()
+                },
+                "spans": {kind: histogram.emf() for kind, histogram in self.spans.items()},
+                "slowest": {
+                    kind: [
+                        {"key": key, "ms": round(ms, 1)}
+                        for key, ms in sorted(totals.items(), key=lambda item: -item[1])[:TOP_N]
+                    ]
+                    for kind, totals in self.span_totals.items()
+                }
+            }
+
+    def _emf_documents(self, summary):
+        timestamp = int(time.time() * 1000)
+
+        for api, entry in summary["apis"].items():
+            yield {
+                "_aws": {
+                    "Timestamp": timestamp,
+                    "CloudWatchMetrics": [{
+                        "Namespace": self.namespace,
+                        "Dimensions": [["Service", "Api"]],
+                        "Metrics": [
+                            {"Name": "ApiLatency", "Unit": "Milliseconds"},
+                            {"Name": "ApiCalls", "Unit": "Count"},
+                            {"Name": "ApiErrors", "Unit": "Count"},
+                            {"Name": "ApiRetries", "Unit": "Count"},
+                            {"Name": "ApiThrottles", "Unit": "Count"}
+                        ]
+                    }]
+                },
+                "Service": self.service,
+                "Api": api,
+                "ApiLatency": entry["latency_ms"],
+                "ApiCalls": entry["calls"],
+                "ApiErrors": entry["errors"],
+                "ApiRetries": entry["retries"],
+                "ApiThrottles": entry["throttles"],
+                "correlation_id": summary["correlation_id"]
+            }
+
+        for kind, histogram in summary["spans"].items():
+            yield {
+                "_aws": {
+                    "Timestamp": timestamp,
+                    "CloudWatchMetrics": [{
+                        "Namespace": self.namespace,
+                        "Dimensions": [["Service", "Span"]],
+                        "Metrics": [{"Name": "SpanDuration", "Unit": "Milliseconds"}]
+                    }]
+                },
+                "Service": self.service,
+                "Span": kind,
+                "SpanDuration": histogram,
+                "slowest": summary["slowest"].get(kind, []),
+                "correlation_id": summary["correlation_id"]
+            }
+
+    def flush(self):
+        summary = self.summary()
+
+        if self.mode == "emf":
+            # EMF lines must be bare JSON log events, so bypass the logging prefix.
+            for document in self._emf_documents(summary):
+                sys.stdout.write(json.dumps(document) + "\n")
+            sys.stdout.flush()
+        elif self.mode == "json" and self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "w") as f:
+                json.dump(summary, f, indent=2)
+
+        return summary
+
+
+_metrics = {"current": NullMetrics()}
+
+
+def start_run(mode="off", namespace="DigitalCoworker", service="", path=None):
+    """
+    Begin a run: one correlation id for every log line until the next
+    start_run, and a fresh metrics collector ("emf", "json" or "off").
+    """
+    _run["correlation_id"] = str(uuid.uuid4())
+    if mode in ("emf", "json"):
+        _metrics["current"] = Metrics(mode, namespace, service, path)
+    else:
+        _metrics["current"] = NullMetrics()
+    return _metrics["current"]
+
+
+def get_metrics():
+    return _metrics["current"]
@@ -0,0 +1,22 @@
+from core.retry import aws_retry
+
+
+def paginate(call, result_key, limiter_key=None, page_size=100, **params):
+    """
+    Yield every item of a Marker-paginated describe call (RDS style).
+    Each page goes through aws_retry on its own, so a throttled page is
+    retried without restarting the listing.
+    """
+    marker = None
+    while True:
+        if marker:
+            params["Marker"] = marker
+        page = aws_retry(
+            lambda: call(MaxRecords=page_size, **params),
+            limiter_key=limiter_key
+        )
+        yield from page.get(result_key, [])
+
+        marker = page.get("Marker")
+        if not marker:
+            return
@@ -0,0 +1,133 @@
+"""
+Findings as a Hive-partitioned dataset that Athena (or any Parquet/JSON
+scanner) can query across runs:
+
+    {location}/dt=YYYY-MM-DD/account=<id>/audit=<audit>/<run_id>.parquet
+    {location}/_manifests/dt=YYYY-MM-DD/audit=<audit>/<run_id>.json
+
+Each run adds files instead of overwriting a report. Parquet needs
+pyarrow; without it the files are gzipped JSON lines (.jsonl.gz) with the
+same columns. Manifests live under "_manifests", which Hive and Athena skip
+when reading the table.
+"""
+
+import gzip
+import importlib.util
+import io
+import json
+import os
+
+from core.logger import get_logger
+from core.s3_upload import MultipartUpload
+
+# Data columns; dt, account and audit are partition columns and live in the path.
+COLUMNS = [
+    "run_id",
+    "checked_at",
+    "account_id",
+    "region",
+    "resource",
+    "code",
+    "issue",
+    "params"
+]
+
+EXTENSIONS = {"parquet": ".parquet", "jsonl": ".jsonl.gz"}
+CONTENT_TYPES = {"parquet": "application/vnd.apache.parquet", "jsonl": "application/gzip"}
+
+log = get_logger()
+
+
+def resolve_format(fmt):
+    """fmt, or "jsonl" when Parquet is asked for and pyarrow is not installed."""
+    if fmt == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        log(30, {"event": "report_format_fallback", "requested": "parquet", "format": "jsonl",
+                 "reason": "pyarrow is not installed"})
+        return "jsonl"
+    return fmt
+
+
+def _row(f, run_id, checked_at):
+    return {
+        "run_id": run_id,
+        "checked_at": checked_at,
+        "account_id": f.account_id,
+        "region": f.region,
+        "resource": f.resource,
+        "code": f.code,
+        "issue": f.issue,
+        "params": json.dumps(dict(f.params), separators=(",", ":")) if f.params else ""
+    }
+
+
+def _encode(rows, fmt):
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([(column, pa.string()) for column in COLUMNS])
+        table = pa.Table.from_pydict({column: [row[column] for row in rows] for column in COLUMNS}, schema=schema)
+        buffer = io.BytesIO()
+        pq.write_table(table, buffer, compression="snappy")
+        return buffer.getvalue()
+
+    return gzip.compress("".join(json.dumps(row, separators=(",", ":")) + "\n" for row in rows).encode())
+
+
+def _put(location, body, content_type):
+    """Write bytes to an s3:// URI or a local path."""
+    if location.startswith("s3://"):
+        bucket, _, key = location[len("s3://"):].partition("/")
+        upload = MultipartUpload(bucket, key, content_type=content_type)
+        upload.write(body)
+        upload.complete()
+        return
+
+    os.makedirs(os.path.dirname(location) or ".", exist_ok=True)
+    tmp = location + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(body)
+    os.replace(tmp, location)
+
+
+def write_partitioned(findings, location, audit, run_id, checked_at, fmt="parquet", accounts=(), errors=()):
+    """
+    Write one file per account with findings and the run's manifest.
+    accounts lists every account the run covered, so the manifest tells
+    "no findings" apart from "not scanned"; errors lists the parts of the
+    run that failed or stopped early. Returns the manifest.
+    """
+    fmt = resolve_format(fmt)
+    dt = checked_at[:10]
+    location = location.rstrip("/")
+
+    rows_by_account = {}
+    for f in findings:
+        rows_by_account.setdefault(f.account_id, []).append(_row(f, run_id, checked_at))
+
+    files = []
+    for account_id, rows in rows_by_account.items():
+        path = f"{location}/dt={dt}/account={account_id}/audit={audit}/{run_id}{EXTENSIONS[fmt]}"
+        _put(path, _encode(rows, fmt), CONTENT_TYPES[fmt])
+        files.append({"account": account_id, "location": path, "rows": len(rows)})
+
+    manifest = {
+        "version": 1,
+        "run_id": run_id,
+        "audit": audit,
+        "dt": dt,
+        "checked_at": checked_at,
+        "format": fmt,
+        "columns": COLUMNS,
+        "partitions": ["dt", "account", "audit"],
+        "accounts": list(dict.fromkeys(list(accounts) + list(rows_by_account))),
+        "rows": sum(entry["rows"] for entry in files),
+        "files": files,
+        "errors": list(errors)
+    }
+    manifest_location = f"{location}/_manifests/dt={dt}/audit={audit}/{run_id}.json"
+    _put(manifest_location, json.dumps(manifest, indent=2).encode(), "application/json")
+
+    log(20, {"event": "report_written", "format": fmt, "files": len(files), "rows": manifest["rows"],
+             "manifest": manifest_location})
+    return manifest
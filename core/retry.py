@@ -0,0 +1,201 @@
+import random
+import threading
+import time
+
+from botocore.exceptions import (
+    ClientError,
+    ConnectionClosedError,
+    ConnectTimeoutError,
+    EndpointConnectionError,
+    ReadTimeoutError,
+)
+
+from core.logger import get_metrics
+
+# Codes that mean "slow down" - these also shrink the shared rate limiter.
+THROTTLE_CODES = {
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "RequestThrottled",
+    "RequestThrottledException",
+    "TooManyRequestsException",
+    "RequestLimitExceeded",
+    "SlowDown",
+    "BandwidthLimitExceeded",
+    "ProvisionedThroughputExceededException",
+    "PriorRequestNotComplete",
+}
+
+# Transient server-side codes worth another attempt.
+TRANSIENT_CODES = {
+    "InternalError",
+    "InternalFailure",
+    "ServiceUnavailable",
+    "ServiceUnavailableException",
+    "RequestTimeout",
+    "RequestTimeoutException",
+    "IDPCommunicationError",
+    "500",
+    "502",
+    "503",
+    "504",
+}
+
+RETRYABLE_CODES = THROTTLE_CODES | TRANSIENT_CODES
+
+NETWORK_ERRORS = (
+    ConnectionClosedError,
+    ConnectTimeoutError,
+    EndpointConnectionError,
+    ReadTimeoutError,
+)
+
+DEFAULT_RATE = 50.0
+DEFAULT_BURST = 50
+MIN_RATE = 1.0
+
+
+def error_code(e):
+    return e.response.get("Error", {}).get("Code", "")
+
+
+def classify(e):
+    """Return "throttle", "retryable" or "fatal" for a botocore exception."""
+    if isinstance(e, NETWORK_ERRORS):
+        return "retryable"
+    if isinstance(e, ClientError):
+        code = error_code(e)
+        if code in THROTTLE_CODES:
+            return "throttle"
+        if code in TRANSIENT_CODES:
+            return "retryable"
+    return "fatal"
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every caller of one (account, service, api).
+    Halves its refill rate on throttling and creeps back up on success,
+    so concurrent workers back off together instead of in lockstep.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def on_throttle(self):
+        with self.lock:
+            self.rate = max(MIN_RATE, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+
+    def on_success(self):
+        with self.lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + 0.1 * self.max_rate)
+
+
+_limiters = {}
+_limits = {"rate": DEFAULT_RATE, "burst": DEFAULT_BURST}
+_stats = {"calls": 0, "retries": 0, "throttles": 0, "fatal": 0, "by_api": {}}
+_lock = threading.Lock()
+
+
+def configure_rate_limits(rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+    """Set the rate/burst used for limiters created from now on."""
+    with _lock:
+        _limits["rate"] = rate
+        _limits["burst"] = burst
+
+
+def get_rate_limiter(key):
+    with _lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = RateLimiter(_limits["rate"], _limits["burst"])
+        return limiter
+
+
+def _count(api, field):
+    with _lock:
+        _stats[field] += 1
+        per_api = _stats["by_api"].setdefault(
+            api, {"calls": 0, "retries": 0, "throttles": 0, "fatal": 0}
+        )
+        per_api[field] += 1
+    get_metrics().count_api(api, field)
+
+
+def get_retry_stats():
+    with _lock:
+        return {
+            "calls": _stats["calls"],
+            "retries": _stats["retries"],
+            "throttles": _stats["throttles"],
+            "fatal": _stats["fatal"],
+            "by_api": {api: dict(counts) for api, counts in _stats["by_api"].items()},
+        }
+
+
+def reset_retry_stats():
+    with _lock:
+        _stats.update(calls=0, retries=0, throttles=0, fatal=0, by_api={})
+
+
+def aws_retry(callable_fn, retries=5, base_delay=0.5, max_delay=20, limiter_key=None):
+    """
+    Call callable_fn, retrying throttling and transient errors with
+    exponential backoff and full jitter. Fatal errors (AccessDenied,
+    NoSuchBucketPolicy, ...) are raised on the first attempt.
+
+    limiter_key is an (account_id, service, api) tuple; callers sharing
+    a key share one token bucket.
+    """
+    limiter = get_rate_limiter(limiter_key) if limiter_key else None
+    api = ".".join(limiter_key[1:]) if limiter_key else "unknown"
+
+    for attempt in range(1, retries + 1):
+        if limiter:
+            limiter.acquire()
+        _count(api, "calls")
+        started = time.perf_counter()
+        try:
+            result = callable_fn()
+        except (ClientError,) + NETWORK_ERRORS as e:
+            get_metrics().observe_api(api, started, error=True)
+            kind = classify(e)
+            if kind == "fatal":
+                _count(api, "fatal")
+                raise
+            if kind == "throttle":
+                _count(api, "throttles")
+                if limiter:
+                    limiter.on_throttle()
+            if attempt == retries:
+                raise
+            _count(api, "retries")
+            time.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1))))
+        else:
+            get_metrics().observe_api(api, started)
+            if limiter:
+                limiter.on_success()
+            return result
@@ -0,0 +1,96 @@
+from core.aws_session import get_base_client
+from core.retry import aws_retry
+
+# S3 requires every part except the last to be at least 5 MiB.
+PART_SIZE = 8 * 1024 * 1024
+
+
+def _call(api, fn):
+    # Report clients come from the shared cache, which leaves retries to aws_retry.
+    return aws_retry(fn, limiter_key=("report", "s3", api))
+
+
+def upload_report(bucket, key, content):
+    s3 = get_base_client("s3")
+
+    _call("PutObject", lambda: s3.put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=content,
+        ServerSideEncryption="aws:kms"
+    ))
+
+
+class MultipartUpload:
+    """
+    Buffers written bytes and ships them as fixed-size multipart parts,
+    so at most one part is held in memory. Reports smaller than one part
+    fall back to a single put_object on complete().
+    """
+
+    def __init__(self, bucket, key, part_size=PART_SIZE, content_type="text/csv", content_encoding=None):
+        self.s3 = get_base_client("s3")
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.extra = {"ServerSideEncryption": "aws:kms", "ContentType": content_type}
+        if content_encoding:
+            self.extra["ContentEncoding"] = content_encoding
+        self.buffer = bytearray()
+        self.upload_id = None
+        self.parts = []
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= self.part_size:
+            self._upload_part(bytes(self.buffer[:self.part_size]))
+            del self.buffer[:self.part_size]
+
+    def _upload_part(self, body):
+        if self.upload_id is None:
+            self.upload_id = _call("CreateMultipartUpload", lambda: self.s3.create_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                **self.extra
+            ))["UploadId"]
+
+        number = len(self.parts) + 1
+        etag = _call("UploadPart", lambda: self.s3.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=number,
+            Body=body
+        ))["ETag"]
+        self.parts.append({"PartNumber": number, "ETag": etag})
+
+    def complete(self):
+        if self.upload_id is None:
+            _call("PutObject", lambda: self.s3.put_object(
+                Bucket=self.bucket,
+                Key=self.key,
+                Body=bytes(self.buffer),
+                **self.extra
+            ))
+            self.buffer.clear()
+            return
+
+        if self.buffer:
+            self._upload_part(bytes(self.buffer))
+            self.buffer.clear()
+
+        _call("CompleteMultipartUpload", lambda: self.s3.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            MultipartUpload={"Parts": self.parts}
+        ))
+
+    def abort(self):
+        if self.upload_id is not None:
+            _call("AbortMultipartUpload", lambda: self.s3.abort_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self.upload_id
+            ))
+        self.buffer.clear()
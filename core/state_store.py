@@ -0,0 +1,114 @@
+import json
+import os
+
+from botocore.exceptions import ClientError
+
+from core.aws_session import get_base_client
+from core.retry import aws_retry
+
+
+def _call(api, fn):
+    return aws_retry(fn, limiter_key=("state", "s3", api))
+
+
+def _split_s3_uri(location):
+    bucket, _, key = location[len("s3://"):].partition("/")
+    return bucket, key
+
+
+def load_state(location):
+    """Load JSON state from an s3:// URI or a local path; {} if it does not exist yet."""
+    if location.startswith("s3://"):
+        bucket, key = _split_s3_uri(location)
+        try:
+            body = _call("GetObject", lambda: get_base_client("s3").get_object(Bucket=bucket, Key=key)["Body"].read())
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                return {}
+            raise
+        return json.loads(body)
+
+    if not os.path.exists(location):
+        return {}
+    with open(location) as f:
+        return json.load(f)
+
+
+def save_state(location, state):
+    body = json.dumps(state, separators=(",", ":"))
+
+    if location.startswith("s3://"):
+        bucket, key = _split_s3_uri(location)
+        _call("PutObject", lambda: get_base_client("s3").put_object(
+            Bucket=bucket,
+            Key=key,
+            Body=body,
+            ServerSideEncryption="aws:kms"
+        ))
+        return
+
+    os.makedirs(os.path.dirname(location) or ".", exist_ok=True)
+    tmp = location + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(body)
+    os.replace(tmp, location)
+
+
+def create_state(location, state):
+    """
+    Save state only if nothing exists at location yet (S3 conditional put,
+    O_EXCL locally). True when this call created it, False when it existed.
+    """
+    body = json.dumps(state, separators=(",", ":"))
+
+    if location.startswith("s3://"):
+        bucket, key = _split_s3_uri(location)
+        try:
+            _call("PutObject", lambda: get_base_client("s3").put_object(
+                Bucket=bucket,
+                Key=key,
+                Body=body,
+                IfNoneMatch="*",
+                ServerSideEncryption="aws:kms"
+            ))
+        except ClientError as e:
+            # 409 ConditionalRequestConflict: a concurrent conditional put is winning.
+            if e.response.get("Error", {}).get("Code") in ("PreconditionFailed", "ConditionalRequestConflict"):
+                return False
+            raise
+        return True
+
+    os.makedirs(os.path.dirname(location) or ".", exist_ok=True)
+    try:
+        fd = os.open(location, os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w") as f:
+        f.write(body)
+    return True
+
+
+def delete_state(location):
+    """Remove state at an s3:// URI or local path; missing state is not an error."""
+    if location.startswith("s3://"):
+        bucket, key = _split_s3_uri(location)
+        _call("DeleteObject", lambda: get_base_client("s3").delete_object(Bucket=bucket, Key=key))
+        return
+
+    if os.path.exists(location):
+        os.remove(location)
+
+
+def count_objects(prefix):
+    """Number of objects under an s3:// prefix or files in a local directory."""
+    if prefix.startswith("s3://"):
+        bucket, key = _split_s3_uri(prefix)
+        paginator = get_base_client("s3").get_paginator("list_objects_v2")
+        # A failed page restarts the count.
+        return _call("ListObjectsV2", lambda: sum(
+            page.get("KeyCount", 0) for page in paginator.paginate(Bucket=bucket, Prefix=key)
+        ))
+
+    if not os.path.isdir(prefix):
+        return 0
+    return len([name for name in os.listdir(prefix) if not name.endswith(".tmp")])
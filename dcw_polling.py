@@ -0,0 +1,69 @@
+import asyncio
+import time
+
+
+# Adaptive re-check schedule for DCW verification: files still unmodified
+# are re-checked after initial_interval, then on an interval growing by
+# factor up to max_interval, until timeout. Files seen modified or removed
+# leave the watch set, and polling ends as soon as the set is empty.
+class ChangePoller:
+
+    def __init__(self, ids, timeout, initial_interval=1.0, max_interval=15.0, factor=2.0, clock=time.monotonic):
+        self.pending = set(ids)
+        self.modified = {}  # id -> (after value, seconds from start until it was seen modified)
+        self.removed = set()  # ids found deleted while polling
+        self.timeout = timeout
+        self.interval = initial_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.clock = clock
+        self.started = clock()
+        self.checks = 0
+
+    def elapsed(self):
+        return self.clock() - self.started
+
+    # changes: {id: after value} of pending files found modified in this
+    # check; None as the value marks a file found removed
+    def record(self, changes):
+        self.checks += 1
+        seen_at = self.elapsed()
+        for file_id, after in changes.items():
+            if file_id in self.pending:
+                self.pending.discard(file_id)
+                if after is None:
+                    self.removed.add(file_id)
+                else:
+                    self.modified[file_id] = (after, seen_at)
+
+    # Seconds to wait before the next check, or None when polling is over
+    def next_delay(self):
+        remaining = self.timeout - self.elapsed()
+        if not self.pending or remaining <= 0:
+            return None
+        delay = min(self.interval, remaining)
+        self.interval = min(self.interval * self.factor, self.max_interval)
+        return delay
+
+
+# Poll check(pending_ids) -> {id: after or None if removed} until every id
+# is modified or removed, or timeout passes; returns the finished ChangePoller
+async def poll_for_changes(check, ids, timeout, **schedule):
+    poller = ChangePoller(ids, timeout, **schedule)
+    delay = poller.next_delay()
+    while delay is not None:
+        await asyncio.sleep(delay)
+        poller.record(await check(set(poller.pending)))
+        delay = poller.next_delay()
+    return poller
+
+
+# poll_for_changes for a blocking check
+def poll_for_changes_sync(check, ids, timeout, **schedule):
+    poller = ChangePoller(ids, timeout, **schedule)
+    delay = poller.next_delay()
+    while delay is not None:
+        time.sleep(delay)
+        poller.record(check(set(poller.pending)))
+        delay = poller.next_delay()
+    return poller
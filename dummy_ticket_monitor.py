@@ -1,8 +1,10 @@
 import time
-import copy
+import threading
 from datetime import datetime
 import structlog
 
+from dcw_polling import poll_for_changes_sync
+
 
 structlog.configure(
     processors=[
@@ -58,7 +60,8 @@ class DummySharePointProvider(SharePointProvider):
         return list(self.files.values())
 
     def get_file_metadata(self, file_id):
-        return copy.deepcopy(self.files[file_id])
+        # Stored records are never mutated (simulate_dcw replaces them), so no copy is needed
+        return self.files[file_id]
 
     def simulate_dcw(self, delay_seconds=3):
         """
@@ -68,16 +71,18 @@ class DummySharePointProvider(SharePointProvider):
         time.sleep(delay_seconds)
         dcw_time = datetime.utcnow()
 
-        for file in self.files.values():
-            file["last_modified"] = dcw_time
+        for file_id, file in self.files.items():
+            self.files[file_id] = {**file, "last_modified": dcw_time}
 
         log.info("dcw_simulation_completed", modified_files=len(self.files))
 
 
 # DCW Verification Logic (PRODUCTION LOGIC)
-def verify_dcw(provider, single_file_id=None, wait_seconds=3):
+def verify_dcw(provider, single_file_id=None, timeout_seconds=10, dcw_delay_seconds=3):
     """
-    Detect DCW execution by comparing last_modified timestamps
+    Detect DCW execution by comparing last_modified timestamps.
+    Unmodified files are re-checked on a growing interval until all are
+    modified or timeout_seconds have passed.
     """
 
     log.info("dcw_verification_started", single_file=bool(single_file_id))
@@ -88,37 +93,53 @@ def verify_dcw(provider, single_file_id=None, wait_seconds=3):
         files = [f for f in files if f["id"] == single_file_id]
 
  
+    # Only the timestamps are needed as the baseline
     before_state = {
-        f["id"]: provider.get_file_metadata(f["id"])
+        f["id"]: provider.get_file_metadata(f["id"])["last_modified"]
         for f in files
     }
 
 
-    provider.simulate_dcw(wait_seconds)
+    # The DCW runs in the background while the files are watched
+    dcw = threading.Thread(target=provider.simulate_dcw, args=(dcw_delay_seconds,))
+    dcw.start()
+
+    def check(pending):
+        changes = {}
+        for file_id in pending:
+            after = provider.get_file_metadata(file_id)
+            if after["last_modified"] != before_state[file_id]:
+                changes[file_id] = after["last_modified"]
+        return changes
+
+    poller = poll_for_changes_sync(check, before_state, timeout_seconds, initial_interval=0.5, max_interval=2)
+    dcw.join()
 
 
     for file in files:
         before = before_state[file["id"]]
-        after = provider.get_file_metadata(file["id"])
+        after, seconds = poller.modified.get(file["id"], (before, None))
 
-        dcw_ran = before["last_modified"] != after["last_modified"]
+        dcw_ran = before != after
 
         log.info(
             "dcw_check_result",
-            file_name=after["name"],
-            file_path=after["path"],
-            before_modified=str(before["last_modified"]),
-            after_modified=str(after["last_modified"]),
-            dcw_ran=dcw_ran
+            file_name=file["name"],
+            file_path=file["path"],
+            before_modified=str(before),
+            after_modified=str(after),
+            dcw_ran=dcw_ran,
+            seconds_to_modification=seconds
         )
 
         print(
             f"{ 'Successful' if dcw_ran else 'Failed' } DCW "
-            f"{after['path']} | "
-            f"{before['last_modified']} → {after['last_modified']}"
+            f"{file['path']} | "
+            f"{before} → {after}"
+            + (f" | seen after {seconds:.1f}s" if dcw_ran else "")
         )
 
-    log.info("dcw_verification_completed")
+    log.info("dcw_verification_completed", checks=poller.checks, seconds=round(poller.elapsed(), 1))
 
 
 # =====================================================
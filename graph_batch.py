@@ -0,0 +1,99 @@
+import asyncio
+import itertools
+
+import structlog
+
+GRAPH_URL = "https://graph.microsoft.com/v1.0"
+GRAPH_SCOPE = "https://graph.microsoft.com/.default"
+BATCH_SIZE = 20  # Graph's limit of sub-requests per $batch call
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+log = structlog.get_logger()
+
+
+class GraphRequestError(Exception):
+    def __init__(self, url, status, body=None):
+        super().__init__(f"GET {url} failed with status {status}: {body}")
+        self.url = url
+        self.status = status
+        self.body = body
+
+
+# Packs per-id Graph GETs into /$batch calls of up to BATCH_SIZE
+# sub-requests, sends max_concurrency batches at a time and retries
+# failed sub-requests one by one
+class GraphBatchClient:
+
+    def __init__(self, credential, proxy=None, max_concurrency=4, max_retries=3, http=None):
+        self.credential = credential
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_retries = max_retries
+        self._token = None
+        if http is None:
+            import httpx
+
+            mounts = {"https://": httpx.AsyncHTTPTransport(proxy=proxy)} if proxy else None
+            http = httpx.AsyncClient(mounts=mounts, timeout=60)
+        self.http = http
+
+    async def _headers(self):
+        # azure.identity credentials cache tokens and refresh them before expiry
+        self._token = await self.credential.get_token(GRAPH_SCOPE)
+        return {"Authorization": f"Bearer {self._token.token}"}
+
+    # One GET, retried on throttling and server errors (honouring Retry-After)
+    async def get(self, url):
+        for attempt in itertools.count(1):
+            async with self.semaphore:
+                response = await self.http.get(GRAPH_URL + url, headers=await self._headers())
+            if response.status_code < 300:
+                return response.json()
+            if response.status_code not in RETRY_STATUSES or attempt > self.max_retries:
+                raise GraphRequestError(url, response.status_code, response.text)
+            await asyncio.sleep(float(response.headers.get("Retry-After", 2 ** attempt)))
+
+    async def _send_batch(self, urls):
+        body = {"requests": [{"id": str(i), "method": "GET", "url": url} for i, url in enumerate(urls)]}
+        for attempt in itertools.count(1):
+            async with self.semaphore:
+                response = await self.http.post(f"{GRAPH_URL}/$batch", json=body, headers=await self._headers())
+            if response.status_code < 300:
+                break
+            if response.status_code not in RETRY_STATUSES or attempt > self.max_retries:
+                raise GraphRequestError("/$batch", response.status_code, response.text)
+            await asyncio.sleep(float(response.headers.get("Retry-After", 2 ** attempt)))
+
+        # Sub-responses may come back in any order
+        results = [None] * len(urls)
+        failed = []
+        for sub in response.json()["responses"]:
+            i = int(sub["id"])
+            if sub["status"] < 300:
+                results[i] = sub.get("body")
+            elif sub["status"] in RETRY_STATUSES:
+                failed.append(i)
+            else:
+                results[i] = GraphRequestError(urls[i], sub["status"], sub.get("body"))
+
+        if failed:
+            log.info("graph_batch_retry", failed=len(failed), batch_size=len(urls))
+            retried = await asyncio.gather(*(self.get(urls[i]) for i in failed), return_exceptions=True)
+            for i, result in zip(failed, retried):
+                results[i] = result
+        return results
+
+    # Response bodies of GET urls (relative to GRAPH_URL), in the order given.
+    # A sub-request that still fails is raised, or returned in its slot with
+    # return_exceptions=True
+    async def get_many(self, urls, return_exceptions=False):
+        urls = list(urls)
+        batches = [urls[i:i + BATCH_SIZE] for i in range(0, len(urls), BATCH_SIZE)]
+        results = [r for batch in await asyncio.gather(*(self._send_batch(b) for b in batches)) for r in batch]
+        if not return_exceptions:
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+        return results
+
+    async def close(self):
+        await self.http.aclose()
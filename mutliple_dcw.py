@@ -5,6 +5,8 @@ import random
 import sys
 import structlog
 
+from dcw_polling import poll_for_changes
+
 structlog.configure(
     processors=[
         structlog.processors.TimeStamper(fmt="iso"),
@@ -38,22 +40,37 @@ async def simulate_multiple_dcws(files, delay=5):
     log.info("dcw_simulation_completed")
 
 
-async def verify_multiple_dcws(wait_seconds=65):
+async def verify_multiple_dcws(wait_seconds=65, dcw_delay_seconds=5):
+    """
+    Re-checks unmodified files on a growing interval while the DCWs run,
+    until every file is modified or wait_seconds have passed.
+    """
     log.info("dcw_verification_started", mode="MULTI_DCW")
 
     files = list_dummy_files()
+    by_id = {f["id"]: f for f in files}
 
     snapshot = {
         f["id"]: f["last_modified"] for f in files
     }
 
-    await simulate_multiple_dcws(files, wait_seconds)
+    dcws = asyncio.create_task(simulate_multiple_dcws(files, dcw_delay_seconds))
+
+    async def check(pending):
+        return {
+            file_id: by_id[file_id]["last_modified"]
+            for file_id in pending
+            if by_id[file_id]["last_modified"] > snapshot[file_id]
+        }
+
+    poller = await poll_for_changes(check, snapshot, wait_seconds, initial_interval=1, max_interval=10)
+    dcws.cancel()
 
     # Compare results
     dcw_hits = 0
     for f in files:
         before = snapshot[f["id"]]
-        after = f["last_modified"]
+        after, seconds = poller.modified.get(f["id"], (before, None))
 
         dcw_ran = after > before
         if dcw_ran:
@@ -66,13 +83,15 @@ async def verify_multiple_dcws(wait_seconds=65):
             before_modified=before.isoformat(),
             after_modified=after.isoformat(),
             dcw_ran=dcw_ran,
-            dcw_name=f.get("dcw", "unknown")
+            dcw_name=f.get("dcw", "unknown"),
+            seconds_to_modification=seconds
         )
 
     log.info(
         "dcw_verification_completed",
         total_files=len(files),
-        dcw_triggered_files=dcw_hits
+        dcw_triggered_files=dcw_hits,
+        checks=poller.checks
     )
 
 async def main():
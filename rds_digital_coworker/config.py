@@ -1,9 +1,56 @@
 import os
 import json
+from datetime import datetime, timezone
+
+# Parsed and validated once per container (module import); a bad setting
+# fails the first invocation with one clear message instead of mid-scan.
+
+
+def _required(name):
+    value = os.environ.get(name, "").strip()
+    if not value:
+        raise ValueError(f"{name} must be set")
+    return value
+
+
+def _choice(name, default, choices):
+    value = os.environ.get(name, default)
+    if value not in choices:
+        raise ValueError(f"{name} must be one of {', '.join(choices)}, got {value!r}")
+    return value
+
+
+def _timestamp(name):
+    """An optional ISO 8601 time as naive UTC (no offset means UTC)."""
+    value = os.environ.get(name, "").strip()
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 timestamp, got {value!r}")
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _accounts(fields):
+    try:
+        accounts = json.loads(_required("ACCOUNTS_JSON"))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"ACCOUNTS_JSON is not valid JSON: {e}")
+    if not isinstance(accounts, list):
+        raise ValueError("ACCOUNTS_JSON must be a JSON list of accounts")
+    for index, acc in enumerate(accounts):
+        missing = [field for field in fields if not isinstance(acc, dict) or field not in acc]
+        if missing:
+            raise ValueError(f"ACCOUNTS_JSON[{index}] is missing {', '.join(missing)}")
+    return accounts
+
 
 SERVICE_NAME = "rds-backup-compliance-coworker"
 
-ACCOUNTS = json.loads(os.environ["ACCOUNTS_JSON"])
+ACCOUNTS = _accounts(("account_id", "role_arn", "regions"))
 # Example:
 # [
 #   {
@@ -14,7 +61,64 @@ ACCOUNTS = json.loads(os.environ["ACCOUNTS_JSON"])
 # ]
 
 RETENTION_DAYS = int(os.environ.get("RETENTION_DAYS", "30"))
+# Snapshot ages are measured at the run's start (its CheckedAt), which every
+# slice of a continued run shares; AUDIT_AS_OF measures them at another time,
+# e.g. to repeat a past audit or to match a simulated estate.
+AUDIT_AS_OF = _timestamp("AUDIT_AS_OF")
 
-REPORT_BUCKET = os.environ["REPORT_BUCKET"]
+REPORT_BUCKET = _required("REPORT_BUCKET")
 REPORT_KEY = os.environ.get("REPORT_KEY", "rds_compliance.csv")
 
+# Shared token bucket per (account, service, api) used by core.retry.aws_retry.
+API_RATE_LIMIT = float(os.environ.get("API_RATE_LIMIT", "50"))
+API_BURST = int(os.environ.get("API_BURST", "50"))
+
+# Stream the report through S3 multipart upload as findings are produced
+# instead of building it in memory; REPORT_COMPRESS gzips it (key gets ".gz").
+REPORT_STREAMING = os.environ.get("REPORT_STREAMING", "false").lower() == "true"
+REPORT_COMPRESS = os.environ.get("REPORT_COMPRESS", "false").lower() == "true"
+
+# Report output: "csv" overwrites REPORT_KEY on every run. "parquet" and
+# "jsonl" instead add one file per account and run under
+# REPORT_LOCATION/dt=/account=/audit=/ plus a run manifest, for Athena;
+# "parquet" falls back to gzipped JSON lines when pyarrow is not installed.
+REPORT_FORMAT = _choice("REPORT_FORMAT", "csv", ("csv", "parquet", "jsonl"))
+REPORT_LOCATION = os.environ.get("REPORT_LOCATION", f"s3://{REPORT_BUCKET}/findings")
+
+# Run instrumentation: "emf" writes CloudWatch Embedded Metric Format lines
+# at the end of each run, "json" writes METRICS_PATH, "off" disables it.
+METRICS_MODE = _choice("METRICS_MODE", "emf", ("emf", "json", "off"))
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "DigitalCoworker")
+METRICS_PATH = os.environ.get("METRICS_PATH", "metrics.json")
+
+# "sequential" visits account/region units one at a time, "concurrent"
+# schedules them on a bounded pool with per-account and per-region caps.
+SCAN_MODE = _choice("SCAN_MODE", "sequential", ("sequential", "concurrent"))
+MAX_WORKERS = int(os.environ.get("MAX_WORKERS", "16"))
+MAX_WORKERS_PER_ACCOUNT = int(os.environ.get("MAX_WORKERS_PER_ACCOUNT", "4"))
+MAX_WORKERS_PER_REGION = int(os.environ.get("MAX_WORKERS_PER_REGION", "8"))
+
+# Where instances and snapshots come from: "live" calls the RDS APIs,
+# "inventory" reads INVENTORY_LOCATIONS (comma-separated local paths or
+# s3:// URIs of JSON-lines dumps or AWS Config advanced-query results,
+# optionally gzipped) and makes no RDS calls.
+RESOURCE_SOURCE = _choice("RESOURCE_SOURCE", "live", ("live", "inventory"))
+INVENTORY_LOCATIONS = [
+    location.strip()
+    for location in os.environ.get("INVENTORY_LOCATIONS", "").split(",")
+    if location.strip()
+]
+if RESOURCE_SOURCE == "inventory" and not INVENTORY_LOCATIONS:
+    raise ValueError("INVENTORY_LOCATIONS must be set when RESOURCE_SOURCE=inventory")
+
+# Time budget per invocation: once less than TIME_RESERVE_SECONDS remain, the
+# scan stops, saves its cursor and partial findings under CHECKPOINT_LOCATION
+# and returns a continuation_token to pass back in the next event.
+# AUTO_CONTINUE makes the function re-invoke itself with that token.
+# The reserve is capped at a quarter of the time left when the invocation
+# starts, and every slice finishes at least one unit before it may stop.
+# A streamed report keeps each slice's findings in a part next to the
+# checkpoint rather than in it.
+TIME_RESERVE_SECONDS = int(os.environ.get("TIME_RESERVE_SECONDS", "60"))
+CHECKPOINT_LOCATION = os.environ.get("CHECKPOINT_LOCATION", f"s3://{REPORT_BUCKET}/checkpoints")
+AUTO_CONTINUE = os.environ.get("AUTO_CONTINUE", "false").lower() == "true"
@@ -1,5 +1,33 @@
+from core.budget import continue_async
 from main import run
+from config import AUTO_CONTINUE
 
 def lambda_handler(event, context):
-    return run()
+    token = (event or {}).get("continuation_token")
+    result = run(context=context, continuation_token=token)
 
+    if result["status"] == "incomplete":
+        # Out of time: the checkpoint is saved, hand the token on.
+        if AUTO_CONTINUE:
+            continue_async(context, result["continuation_token"])
+        return {
+            "status": "incomplete",
+            "continuation_token": result["continuation_token"],
+            "findings": len(result["findings"]),
+            "errors": result["errors"]
+        }
+
+    if not result["findings"].retain:
+        # Streamed report: the findings are in the report only.
+        return {
+            "status": "complete",
+            "findings": len(result["findings"]),
+            "counts": result["findings"].counts(),
+            "errors": result["errors"]
+        }
+
+    return {
+        "status": "complete",
+        "findings": result["findings"].to_dicts("db_instance"),
+        "errors": result["errors"]
+    }
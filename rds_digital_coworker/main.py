@@ -1,62 +1,201 @@
-from core.aws_session import assume_rds_client
-from core.retry import aws_retry
-from core.logger import get_logger
-from rules.backup_enabled_rule import evaluate as backup_rule
-from rules.snapshot_retention_rule import evaluate as snapshot_rule
-from reporting.csv_report import generate_csv
-from reporting.s3_upload import upload_report
+import uuid
+from datetime import datetime, timezone
+from functools import partial
+
+from core.budget import Deadline
+from core.checkpoint_parts import FindingsPart, delete_parts, iter_parts, part_location
+from core.concurrency import iter_bounded
+from core.findings import Finding, FindingsStore
+from core.partitioned_report import write_partitioned
+from core.retry import configure_rate_limits, get_retry_stats, reset_retry_stats
+from core.logger import get_logger, get_metrics, start_run
+from core.state_store import delete_state, load_state, save_state
+from core.s3_upload import MultipartUpload, upload_report
+from rds_audit import scan_region
+from reporting.csv_report import CsvReportSink, generate_csv
+from sources.live import LiveSource
 from config import *
 
 log = get_logger()
 
-def run():
-    findings = []
-
-    for acc in ACCOUNTS:
-        for region in acc["regions"]:
-            try:
-                rds = assume_rds_client(acc["role_arn"], region)
-
-                instances = aws_retry(
-                    lambda: rds.describe_db_instances()["DBInstances"]
-                )
-
-                for db in instances:
-                    db_id = db["DBInstanceIdentifier"]
-
-                    backup_hit, backup_msg = backup_rule(db)
-                    if backup_hit:
-                        findings.append({
-                            "account_id": acc["account_id"],
-                            "region": region,
-                            "db_instance": db_id,
-                            "issue": backup_msg
-                        })
-
-                    snapshots = aws_retry(
-                        lambda: rds.describe_db_snapshots(
-                            DBInstanceIdentifier=db_id,
-                            SnapshotType="automated"
-                        )["DBSnapshots"]
-                    )
-
-                    for msg in snapshot_rule(snapshots, RETENTION_DAYS):
-                        findings.append({
-                            "account_id": acc["account_id"],
-                            "region": region,
-                            "db_instance": db_id,
-                            "issue": msg
-                        })
-
-            except Exception as e:
-                log(40, {
-                    "account_id": acc["account_id"],
-                    "region": region,
-                    "error": str(e)
-                })
-
-    csv_data = generate_csv(findings)
-    upload_report(REPORT_BUCKET, REPORT_KEY, csv_data)
-
-    return findings
+configure_rate_limits(API_RATE_LIMIT, API_BURST)
+
+# Value of the audit= partition in partitioned reports.
+AUDIT = "rds"
+
+def open_report_sink(checked_at=None):
+    if REPORT_COMPRESS:
+        upload = MultipartUpload(REPORT_BUCKET, REPORT_KEY + ".gz", content_type="application/gzip")
+    else:
+        upload = MultipartUpload(REPORT_BUCKET, REPORT_KEY)
+    return CsvReportSink(upload, compress=REPORT_COMPRESS, checked_at=checked_at)
+
+def write_report(findings, checked_at, run_id=None):
+    """The whole report in REPORT_FORMAT (used when it is not streamed)."""
+    if REPORT_FORMAT == "csv":
+        upload_report(REPORT_BUCKET, REPORT_KEY, generate_csv(findings, checked_at))
+        return
+    write_partitioned(
+        findings,
+        REPORT_LOCATION,
+        AUDIT,
+        run_id or uuid.uuid4().hex,
+        checked_at,
+        REPORT_FORMAT,
+        accounts=[acc["account_id"] for acc in ACCOUNTS]
+    )
+
+def open_source():
+    if RESOURCE_SOURCE == "inventory":
+        from sources.inventory import InventorySource
+
+        source = InventorySource(INVENTORY_LOCATIONS)
+        log(20, {"event": "inventory_loaded", "records": source.records, "units": len(source.index)})
+        return source
+    return LiveSource()
+
+def scan_unit(acc, region, source, now=None):
+    """Scan one account/region; returns (findings, error) and never raises."""
+    try:
+        with get_metrics().span("region", f"{acc['account_id']}/{region}"):
+            return scan_region(acc, region, source, RETENTION_DAYS, now), None
+    except Exception as e:
+        error = {
+            "account_id": acc["account_id"],
+            "region": region,
+            "error": str(e)
+        }
+        log(40, dict(error))
+        return [], error
+
+def checkpoint_location(continuation_token):
+    return f"{CHECKPOINT_LOCATION}/{continuation_token}.json"
+
+def checkpoint_parts_prefix(continuation_token):
+    return f"{CHECKPOINT_LOCATION}/{continuation_token}"
+
+def run(mode=SCAN_MODE, streaming=REPORT_STREAMING, context=None, continuation_token=None):
+    """
+    One audit, or one slice of it when context is given: no new
+    account/region unit starts once the invocation's time budget runs low.
+    The cursor, partial findings and errors are checkpointed and
+    {"status": "incomplete", "continuation_token": ...} is returned; passing
+    that token back resumes at the next unit, and the final slice writes
+    the whole report.
+    """
+    metrics = start_run(METRICS_MODE, METRICS_NAMESPACE, SERVICE_NAME, METRICS_PATH)
+    reset_retry_stats()
+
+    checkpoint = None
+    if continuation_token:
+        checkpoint = load_state(checkpoint_location(continuation_token))
+        if not checkpoint:
+            raise ValueError(f"No checkpoint for continuation token {continuation_token}")
+
+    errors = list(checkpoint["errors"]) if checkpoint else []
+    start = checkpoint["cursor"]["unit"] if checkpoint else 0
+    checked_at = checkpoint["checked_at"] if checkpoint else (AUDIT_AS_OF or datetime.utcnow()).isoformat()
+    now = datetime.fromisoformat(checked_at).replace(tzinfo=timezone.utc)
+    deadline = Deadline(context, TIME_RESERVE_SECONDS * 1000) if context else None
+
+    source = open_source()
+    # Only the CSV report is streamed; partitioned formats are written per account at the end.
+    sink = open_report_sink(checked_at) if streaming and REPORT_FORMAT == "csv" else None
+    # A streamed report needs no findings in memory.
+    if checkpoint and "counts" in checkpoint:
+        findings = FindingsStore.from_counts(checkpoint["counts"])
+    else:
+        findings = FindingsStore(
+            (Finding.from_dict(f) for f in checkpoint["findings"]) if checkpoint else (),
+            retain=not sink
+        )
+    if sink and checkpoint:
+        sink.extend(Finding.from_dict(f) for f in checkpoint["findings"])
+
+    # A sliced, streamed run writes each slice's findings to a part next to
+    # its checkpoint; the slice that completes streams all parts into the report.
+    part, parts = None, 0
+    if sink and deadline:
+        continuation_token = continuation_token or uuid.uuid4().hex
+        parts = checkpoint.get("parts", 0) if checkpoint else 0
+        part = FindingsPart(part_location(checkpoint_parts_prefix(continuation_token), parts + 1))
+
+    def collect(result):
+        unit_findings, error = result
+        findings.extend(unit_findings)
+        if part:
+            part.extend(unit_findings)
+        elif sink:
+            sink.extend(unit_findings)
+        if error:
+            errors.append(error)
+
+    units = [
+        (
+            (("account", acc["account_id"]), ("region", region)),
+            partial(scan_unit, acc, region, source, now)
+        )
+        for acc in ACCOUNTS
+        for region in acc["regions"]
+    ][start:]
+
+    if mode == "concurrent":
+        # Results are delivered in unit order, so the report matches the sequential path.
+        done = 0
+        for result in iter_bounded(
+            units,
+            MAX_WORKERS,
+            {"account": MAX_WORKERS_PER_ACCOUNT, "region": MAX_WORKERS_PER_REGION},
+            # Every slice finishes at least one unit, so a resumed scan always advances.
+            stop=(lambda: done > 0 and deadline.expired()) if deadline else None
+        ):
+            collect(result)
+            done += 1
+    else:
+        done = 0
+        for _, scan in units:
+            if deadline and done and deadline.expired():
+                break
+            collect(scan())
+            done += 1
+
+    if done < len(units):
+        if sink:
+            sink.abort()
+        continuation_token = continuation_token or uuid.uuid4().hex
+        (_, account_id), (_, region) = units[done][0]
+        cursor = {"unit": start + done, "account_id": account_id, "region": region}
+        state = {
+            "version": 1,
+            "checked_at": checked_at,
+            "cursor": cursor,
+            "findings": findings.to_dicts(),
+            "errors": errors
+        }
+        if part:
+            part.close()
+            state.update(parts=parts + 1, counts=findings.counts())
+        save_state(checkpoint_location(continuation_token), state)
+        log(20, {"event": "checkpoint_saved", "continuation_token": continuation_token, "cursor": cursor, "findings": len(findings)})
+        metrics.flush()
+        return {"status": "incomplete", "continuation_token": continuation_token, "findings": findings, "errors": errors}
+
+    if part:
+        part.close()
+        parts += 1
+        sink.extend(iter_parts(checkpoint_parts_prefix(continuation_token), parts))
+
+    if sink:
+        sink.close()
+    else:
+        write_report(findings, checked_at, continuation_token)
+
+    if part:
+        delete_parts(checkpoint_parts_prefix(continuation_token), parts)
+    if continuation_token:
+        delete_state(checkpoint_location(continuation_token))
+
+    log(20, {"event": "retry_stats", **get_retry_stats()})
+    metrics.flush()
 
+    return {"status": "complete", "findings": findings, "errors": errors}
@@ -0,0 +1,29 @@
+"""
+RDS backup and snapshot retention audit of one account/region, independent
+of config.py so the coworker (main.py) and the combined audit runner can
+both drive it.
+"""
+
+from core.findings import Finding
+from rules.backup_enabled_rule import evaluate as backup_rule
+from rules.snapshot_retention_rule import evaluate as snapshot_rule
+
+def scan_region(acc, region, source, retention_days, now=None):
+    """
+    Findings for one account/region from source (see sources/); snapshot
+    ages are measured at now (default: the current time).
+    """
+    findings = []
+    instances, snapshots_by_instance = source.load(acc, region)
+
+    for db in instances:
+        db_id = db["DBInstanceIdentifier"]
+
+        backup_hit, backup_code = backup_rule(db)
+        if backup_hit:
+            findings.append(Finding(acc["account_id"], db_id, backup_code, region))
+
+        for code, params in snapshot_rule(snapshots_by_instance.get(db_id, []), retention_days, now):
+            findings.append(Finding(acc["account_id"], db_id, code, region, params))
+
+    return findings
@@ -1,5 +1,8 @@
+from core.findings import register_issue
+
+BACKUPS_DISABLED = register_issue("RDS_BACKUPS_DISABLED", "Automated backups are disabled")
+
 def evaluate(db_instance):
     if db_instance.get("BackupRetentionPeriod", 0) == 0:
-        return True, "Automated backups are disabled"
+        return True, BACKUPS_DISABLED
     return False, None
-
@@ -1,15 +1,37 @@
 from datetime import datetime, timezone
 
-def evaluate(snapshots, retention_days):
-    violations = []
-    now = datetime.now(timezone.utc)
+from core.findings import register_issue
+
+SNAPSHOTS_EXPIRED = register_issue(
+    "RDS_SNAPSHOTS_EXPIRED",
+    "{count} snapshot(s) older than {retention_days} days (oldest age={oldest_age})"
+)
+
+def evaluate(snapshots, retention_days, now=None):
+    """
+    One aggregated (code, params) violation per instance instead of one
+    message per stale snapshot. Ages are measured at now (aware, UTC),
+    by default the current time.
+    """
+    now = now or datetime.now(timezone.utc)
+    count = 0
+    oldest_age = 0
 
     for snap in snapshots:
-        age = (now - snap["SnapshotCreateTime"]).days
+        created = snap.get("SnapshotCreateTime")
+        if created is None:
+            # Still being created; DescribeDBSnapshots has no create time yet.
+            continue
+        age = (now - created).days
         if age > retention_days:
-            violations.append(
-                f"Snapshot older than {retention_days} days (age={age})"
-            )
+            count += 1
+            oldest_age = max(oldest_age, age)
 
-    return violations
+    if not count:
+        return []
 
+    return [(SNAPSHOTS_EXPIRED, {
+        "count": count,
+        "retention_days": retention_days,
+        "oldest_age": oldest_age
+    })]
@@ -0,0 +1,7 @@
+# Only the fields the rules read are kept from instances and snapshots.
+INSTANCE_FIELDS = ("DBInstanceIdentifier", "BackupRetentionPeriod")
+SNAPSHOT_FIELDS = ("DBSnapshotIdentifier", "DBInstanceIdentifier", "SnapshotType", "SnapshotCreateTime")
+
+
+def slim(item, fields):
+    return {field: item[field] for field in fields if field in item}
@@ -0,0 +1,37 @@
+from core.aws_session import assume_rds_client
+from core.pagination import paginate
+from sources.fields import INSTANCE_FIELDS, SNAPSHOT_FIELDS, slim
+
+
+class LiveSource:
+    """Reads each account/region's inventory from the RDS APIs."""
+
+    def load(self, acc, region):
+        """
+        All automated snapshots in a region in a few paginated calls,
+        grouped by instance and cut down to the fields the rules read, and
+        a lazy iterator over the DB instances, fetched one page at a time
+        as the audit consumes them.
+        """
+        rds = assume_rds_client(acc["role_arn"], region)
+        account_id = acc["account_id"]
+
+        snapshots_by_instance = {}
+        for snap in paginate(
+            rds.describe_db_snapshots,
+            "DBSnapshots",
+            limiter_key=(account_id, "rds", "DescribeDBSnapshots"),
+            SnapshotType="automated"
+        ):
+            snapshots_by_instance.setdefault(snap.get("DBInstanceIdentifier"), []).append(slim(snap, SNAPSHOT_FIELDS))
+
+        instances = (
+            slim(db, INSTANCE_FIELDS)
+            for db in paginate(
+                rds.describe_db_instances,
+                "DBInstances",
+                limiter_key=(account_id, "rds", "DescribeDBInstances")
+            )
+        )
+
+        return instances, snapshots_by_instance
@@ -1,11 +1,19 @@
 import os
+import sys
+import json
 import asyncio
+from datetime import datetime, timezone
 from dotenv import load_dotenv
 import structlog
 from azure.identity.aio import ClientSecretCredential
 from msgraph.core import GraphServiceClient, GraphRequestAdapter
 from kioto_authentication_azure.azure_identity_authentication_provider import AzureIdentityAuthenticationProvider
 
+# graph_batch.py and dcw_polling.py are shared with the scripts at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dcw_polling import poll_for_changes
+from graph_batch import GRAPH_URL, GraphBatchClient, GraphRequestError
+
 # Load Environment
 load_dotenv()
 
@@ -13,12 +21,23 @@ AZURE_TENANT_ID = os.getenv("AZURE_TENANT_ID")
 AZURE_CLIENT_ID = os.getenv("AZURE_CLIENT_ID")
 AZURE_CLIENT_SECRET = os.getenv("AZURE_CLIENT_SECRET")
 SITE_URL = os.getenv("SHAREPOINT_SITE_URL")
-WAIT_SECONDS = int(os.getenv("WAIT_SECONDS", "65"))
+WAIT_SECONDS = int(os.getenv("WAIT_SECONDS", "65"))  # Deadline for the DCW to modify every file
+# Unmodified files are re-checked after POLL_INITIAL_SECONDS, then on a doubling interval up to POLL_MAX_SECONDS
+POLL_INITIAL_SECONDS = float(os.getenv("POLL_INITIAL_SECONDS", "2"))
+POLL_MAX_SECONDS = float(os.getenv("POLL_MAX_SECONDS", "15"))
 HTTPS_PROXY = os.getenv("HTTPS_PROXY", None)  # Add proxy support
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "8"))  # Graph requests in flight during the walk
+# "delta": each check fetches only the items changed since the previous one (drive delta query)
+# "items": each check re-fetches the metadata of every file not yet modified
+CHANGE_DETECTION = os.getenv("CHANGE_DETECTION", "delta")
+RESULTS_PATH = os.getenv("RESULTS_PATH", "dcw_results.jsonl")  # One JSON line per checked file
+METADATA_CHUNK = 2000  # Pending files fetched per round of $batch calls in items mode
 
 # Validate essential env variables
 if not all([AZURE_TENANT_ID, AZURE_CLIENT_ID, AZURE_CLIENT_SECRET, SITE_URL]):
     raise EnvironmentError("Missing required Azure or SharePoint environment variables.")
+if CHANGE_DETECTION not in ("delta", "items"):
+    raise EnvironmentError("CHANGE_DETECTION must be 'delta' or 'items'.")
 
 
 # Logging
@@ -81,99 +100,235 @@ async def get_drive(graph_client: GraphServiceClient, library_name: str = "Docum
     return drive
 
 
-# Recursively list all files
-async def list_all_files(graph_client, drive_id):
-    async def _list_items(parent_item, parent_path=""):
-        files = []
-        items = await parent_item.children.get()
-        for item in items.value or []:
+# Follow @odata.nextLink until a folder's children are exhausted
+async def _iter_children(children, semaphore):
+    page = None
+    while True:
+        async with semaphore:
+            page = await (children.with_url(page.odata_next_link) if page else children).get()
+        for item in page.value or []:
+            yield item
+        if not getattr(page, "odata_next_link", None):
+            return
+
+
+# Walk the drive, listing up to max_concurrency folders at a time, and
+# yield files as their folder pages arrive
+async def iter_all_files(graph_client, drive_id, max_concurrency=MAX_CONCURRENCY):
+    drive = graph_client.drives.by_id(drive_id)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    # Files found by the folder tasks; a finished task puts itself here too
+    found = asyncio.Queue()
+    tasks = set()
+
+    async def _list_folder(children, parent_path):
+        async for item in _iter_children(children, semaphore):
             current_path = f"{parent_path}/{item.name}" if parent_path else item.name
             if getattr(item, "folder", None):
-                files.extend(await _list_items(graph_client.drives.by_id(drive_id).items.by_id(item.id), current_path))
+                _walk(drive.items.by_id(item.id).children, current_path)
             else:
-                files.append({
+                found.put_nowait({
                     "id": item.id,
                     "name": item.name,
                     "path": current_path,
+                    "web_url": item.webUrl,
                     "last_modified": item.lastModifiedDateTime
                 })
-        return files
-    
-    root_item = graph_client.drives.by_id(drive_id).root
-    return await _list_items(root_item, "")
+
+    def _walk(children, parent_path):
+        task = asyncio.create_task(_list_folder(children, parent_path))
+        tasks.add(task)
+        task.add_done_callback(found.put_nowait)
+
+    _walk(drive.root.children, "")
+    try:
+        while tasks:
+            entry = await found.get()
+            if isinstance(entry, asyncio.Task):
+                tasks.discard(entry)
+                entry.result()  # re-raise a failed folder listing
+            else:
+                yield entry
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# List all files of the drive
+async def list_all_files(graph_client, drive_id):
+    return [f async for f in iter_all_files(graph_client, drive_id)]
+
+
+# Delta link for "now": a later delta query with it returns only items changed since
+async def get_delta_link(graph_client, drive_id):
+    delta = graph_client.drives.by_id(drive_id).root.delta
+    page = await delta.with_url(f"{GRAPH_URL}/drives/{drive_id}/root/delta?token=latest").get()
+    return page.odata_delta_link
+
+
+# Items changed since delta_link, by id (None for deleted items), and the
+# delta link to continue from
+async def get_changed_items(graph_client, drive_id, delta_link):
+    delta = graph_client.drives.by_id(drive_id).root.delta
+    changed = {}
+    url = delta_link
+    while url:
+        page = await delta.with_url(url).get()
+        for item in page.value or []:
+            changed[item.id] = None if getattr(item, "deleted", None) else item
+        url = getattr(page, "odata_next_link", None)
+    return changed, page.odata_delta_link
+
+
+# Metadata of many files through Graph $batch, in the order given, with
+# None for files deleted since the listing (404); raw JSON, so
+# lastModifiedDateTime is parsed to match the SDK's datetimes
+async def get_items_metadata(batch_client, drive_id, item_ids):
+    items = await batch_client.get_many(
+        (
+            f"/drives/{drive_id}/items/{item_id}?$select=id,name,webUrl,lastModifiedDateTime"
+            for item_id in item_ids
+        ),
+        return_exceptions=True
+    )
+    for index, item in enumerate(items):
+        if isinstance(item, GraphRequestError) and item.status == 404:
+            items[index] = None
+        elif isinstance(item, Exception):
+            raise item
+        else:
+            item["lastModifiedDateTime"] = datetime.fromisoformat(item["lastModifiedDateTime"].replace("Z", "+00:00"))
+    return items
+
+
+# Baseline of one file: what the report needs, with lastModifiedDateTime as a POSIX timestamp
+class FileState:
+    __slots__ = ("name", "web_url", "last_modified")
+
+    def __init__(self, name, web_url, last_modified):
+        self.name = name
+        self.web_url = web_url
+        self.last_modified = last_modified
 
 
 # Verify DCW Execution on all files
-async def verify_dcw(graph_client, drive_id):
+async def verify_dcw(graph_client, batch_client, drive_id, change_detection=CHANGE_DETECTION, results_path=RESULTS_PATH):
     """Verify DCW execution by checking if files are modified in the drive"""
     
-    # Get all files from SharePoint
-    files = await list_all_files(graph_client, drive_id)
+    # Taken before the listing, so changes made while listing are not missed
+    delta_link = await get_delta_link(graph_client, drive_id) if change_detection == "delta" else None
+    
+    # Baseline straight from the listing: interned id -> FileState, no per-file metadata objects kept
+    baseline = {
+        sys.intern(f["id"]): FileState(f["name"], f["web_url"], f["last_modified"].timestamp())
+        async for f in iter_all_files(graph_client, drive_id)
+    }
     
-    if not files:
+    if not baseline:
         log.warning("dcw_verification_no_files", drive_id=drive_id)
         print("No files found in the SharePoint library.")
         return
     
-    log.info("dcw_verification_started", total_files=len(files))
+    log.info("dcw_verification_started", total_files=len(baseline))
+    log.info("dcw_initial_scan_complete", files_scanned=len(baseline), change_detection=change_detection)
+    print(f"Initial scan complete. Watching for changes for up to {WAIT_SECONDS} seconds...")
     
-    # Capture original metadata
-    original_metadata = {}
-    for f in files:
-        original_metadata[f["id"]] = await graph_client.drives.by_id(drive_id).items.by_id(f["id"]).get()
+    # Files the DCW has modified so far among the pending ones, by id; None
+    # for files deleted since the listing
+    async def check(pending):
+        nonlocal delta_link
+        if delta_link:
+            # Only the items changed since the last check need fetching
+            try:
+                changed, delta_link = await get_changed_items(graph_client, drive_id, delta_link)
+                log.info("dcw_delta_fetched", changed_items=len(changed))
+                return {
+                    item_id: item and item.lastModifiedDateTime
+                    for item_id, item in changed.items()
+                    if item_id in pending
+                    and (item is None or item.lastModifiedDateTime.timestamp() != baseline[item_id].last_modified)
+                }
+            except Exception as e:
+                # e.g. an expired delta token (410 Gone): check every pending file instead
+                log.warning("dcw_delta_failed", error=str(e))
+                delta_link = None
+        modified = {}
+        pending = list(pending)
+        for start in range(0, len(pending), METADATA_CHUNK):
+            ids = pending[start:start + METADATA_CHUNK]
+            for item_id, updated in zip(ids, await get_items_metadata(batch_client, drive_id, ids)):
+                if updated is None:
+                    log.info("dcw_file_removed", item_id=item_id)
+                    modified[item_id] = None
+                elif updated["lastModifiedDateTime"].timestamp() != baseline[item_id].last_modified:
+                    modified[item_id] = updated["lastModifiedDateTime"]
+        return modified
     
-    log.info("dcw_initial_scan_complete", files_scanned=len(original_metadata))
-    print(f"Initial scan complete. Waiting {WAIT_SECONDS} seconds before checking for changes...")
+    # Re-check unmodified files on a growing interval; stop once all are modified or at the deadline
+    poller = await poll_for_changes(
+        check,
+        baseline,
+        WAIT_SECONDS,
+        initial_interval=POLL_INITIAL_SECONDS,
+        max_interval=POLL_MAX_SECONDS
+    )
+    log.info("dcw_polling_complete", checks=poller.checks, seconds=round(poller.elapsed(), 1))
     
-    # Wait for DCW to potentially modify files
-    await asyncio.sleep(WAIT_SECONDS)
-    
-    # Check for modifications
-    dcw_results = []
-    for f in files:
-        updated = await graph_client.drives.by_id(drive_id).items.by_id(f["id"]).get()
-        original = original_metadata[f["id"]]
-        dcw_ran = original.lastModifiedDateTime != updated.lastModifiedDateTime
-        
-        result = {
-            "file_name": updated.name,
-            "file_path": updated.webUrl,
-            "before_modified": str(original.lastModifiedDateTime),
-            "after_modified": str(updated.lastModifiedDateTime),
-            "dcw_ran": dcw_ran
-        }
-        dcw_results.append(result)
-        
-        log.info(
-            "dcw_check_result",
-            file_name=updated.name,
-            file_path=updated.webUrl,
-            before_modified=str(original.lastModifiedDateTime),
-            after_modified=str(updated.lastModifiedDateTime),
-            dcw_ran=dcw_ran
-        )
-        
-        status = 'Successful' if dcw_ran else 'Failed'
-        print(
-            f"{status} DCW | {updated.name} | "
-            f"{original.lastModifiedDateTime} → {updated.lastModifiedDateTime}"
-        )
+    # Check for modifications; results go to the JSON lines file as they are produced
+    successful_count = 0
+    with open(results_path, "w", encoding="utf-8") as results:
+        for item_id, state in baseline.items():
+            before = datetime.fromtimestamp(state.last_modified, timezone.utc)
+            after, seconds = poller.modified.get(item_id, (before, None))
+            dcw_ran = item_id in poller.modified
+            removed = item_id in poller.removed
+            successful_count += dcw_ran
+            
+            result = {
+                "file_name": state.name,
+                "file_path": state.web_url,
+                "before_modified": str(before),
+                "after_modified": str(after),
+                "dcw_ran": dcw_ran,
+                "removed": removed,
+                "seconds_to_modification": seconds
+            }
+            results.write(json.dumps(result) + "\n")
+            
+            log.info("dcw_check_result", **result)
+            
+            status = 'Successful' if dcw_ran else 'Removed' if removed else 'Failed'
+            print(
+                f"{status} DCW | {state.name} | "
+                f"{before} → {after}"
+                + (f" | seen after {seconds:.1f}s" if dcw_ran else "")
+            )
     
     # Summary
-    successful_count = sum(1 for r in dcw_results if r["dcw_ran"])
-    log.info("dcw_verification_complete", total_files=len(files), modified_files=successful_count)
+    log.info(
+        "dcw_verification_complete",
+        total_files=len(baseline),
+        modified_files=successful_count,
+        removed_files=len(poller.removed),
+        results_path=results_path
+    )
     print(f"\n--- Summary ---")
-    print(f"Total files checked: {len(files)}")
+    print(f"Total files checked: {len(baseline)}")
     print(f"Files modified by DCW: {successful_count}")
+    print(f"Files removed while polling: {len(poller.removed)}")
+    print(f"Results written to: {results_path}")
 
 
 async def main():
     log.info("application_started", mode="SHAREPOINT_DCW")
     graph_client, credential = await GraphClientFactory.create()
+    batch_client = GraphBatchClient(credential, proxy=HTTPS_PROXY, max_concurrency=MAX_CONCURRENCY)
     try:
         drive = await get_drive(graph_client)
-        await verify_dcw(graph_client, drive.id)
+        await verify_dcw(graph_client, batch_client, drive.id)
     finally:
+        await batch_client.close()
         await credential.close()
     log.info("application_completed")
 